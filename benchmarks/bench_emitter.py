@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Compare building paragraphs with docxsphinx.emitter against the python-docx
+proxies the translator used before.
+
+    python benchmarks/bench_emitter.py [PARAGRAPHS]
+
+Both build the same paragraph heavy body into a fresh document, the
+resulting XML is checked to be identical.
+"""
+from __future__ import print_function
+
+import sys
+import time
+
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+
+from docxsphinx import emitter
+
+RUNS = [('Some plain text, ', False, False), ('strong', True, False),
+        (' more text with a ', False, False), ('emphasis', False, True),
+        (' and the end of the paragraph.', False, False)]
+
+
+def build_with_proxies(document, paragraphs, style_id):
+    for i in range(paragraphs):
+        p = document.add_paragraph()
+        p._p.style = style_id if i % 10 == 0 else None
+        for text, bold, italic in RUNS:
+            run = p.add_run(text)
+            if bold:
+                run.bold = True
+            if italic:
+                run.italic = True
+        if i % 10 == 5:
+            p.paragraph_format.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
+
+
+def build_with_emitter(document, paragraphs, style_id):
+    body = document.element.body
+    styled = emitter.make_paragraph_properties(body, style_id)
+    plain = emitter.make_paragraph_properties(body)
+    left = emitter.make_paragraph_properties(body, alignment='left')
+    runs = [(text, emitter.make_run_properties(body, bold=bold,
+                                               italic=italic))
+            for text, bold, italic in RUNS]
+    for i in range(paragraphs):
+        if i % 10 == 0:
+            pPr = styled
+        elif i % 10 == 5:
+            pPr = left
+        else:
+            pPr = plain
+        p = emitter.add_paragraph(body, pPr)
+        for text, rPr in runs:
+            emitter.add_run(p, text, rPr)
+
+
+def run(build, paragraphs):
+    document = Document()
+    style_id = document.styles.get_style_id('Heading 1',
+                                            WD_STYLE_TYPE.PARAGRAPH)
+    started = time.time()
+    build(document, paragraphs, style_id)
+    return time.time() - started, document.element.body.xml
+
+
+def main(argv):
+    paragraphs = int(argv[1]) if len(argv) > 1 else 5000
+    proxies, expected = run(build_with_proxies, paragraphs)
+    direct, xml = run(build_with_emitter, paragraphs)
+    assert xml == expected, 'the emitter builds different XML'
+    print('%d paragraphs' % paragraphs)
+    print('python-docx proxies %8.3fs' % proxies)
+    print('emitter             %8.3fs (%.1fx)' % (direct, proxies / direct))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
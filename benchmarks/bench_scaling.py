@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Time building a single document of 1k to 100k paragraphs, to check that the
+cost per paragraph of translating and assembling stays the same.
+
+    python benchmarks/bench_scaling.py [PARAGRAPHS ...]
+
+The project is generated in a temporary directory, the phase timings are
+taken from docx-timings.json.
+"""
+from __future__ import print_function
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+from os import path
+
+import docxsphinx
+from docxsphinx import api
+
+CONF = """\
+extensions = ['docxsphinx']
+master_doc = 'index'
+project = 'scaling'
+"""
+
+PARAGRAPH = ('Paragraph {} has **strong** text, *emphasis* and ``code``, '
+             'and a table every thousand paragraphs.\n\n')
+
+TABLE = """\
++-------+-------+
+| a     | b     |
++=======+=======+
+| c     | d     |
++-------+-------+
+
+"""
+
+
+def write_project(srcdir, paragraphs):
+    with open(path.join(srcdir, 'conf.py'), 'w') as f:
+        f.write(CONF)
+    with open(path.join(srcdir, 'index.rst'), 'w') as f:
+        f.write('Scaling\n=======\n\n')
+        for i in range(paragraphs):
+            f.write(PARAGRAPH.format(i))
+            if i % 1000 == 999:
+                f.write(TABLE)
+
+
+def run(paragraphs):
+    tmpdir = tempfile.mkdtemp()
+    try:
+        srcdir = path.join(tmpdir, 'source')
+        outdir = path.join(tmpdir, 'build')
+        os.mkdir(srcdir)
+        write_project(srcdir, paragraphs)
+        docxsphinx.build(srcdir, outdir, status=None)
+        api.clear_cache()
+        with open(path.join(outdir, 'docx-timings.json')) as f:
+            phases = json.load(f)['phases']
+    finally:
+        shutil.rmtree(tmpdir)
+    return phases['translate']['wall'], phases['assemble']['wall']
+
+
+def main(argv):
+    sizes = [int(arg) for arg in argv[1:]] or [1000, 10000, 100000]
+    print('%10s %10s %10s %14s' % ('paragraphs', 'translate', 'assemble',
+                                   'ms per 1000'))
+    for paragraphs in sizes:
+        translate, assemble = run(paragraphs)
+        print('%10d %9.2fs %9.2fs %14.1f' % (
+            paragraphs, translate, assemble,
+            (translate + assemble) * 1000 * 1000 / paragraphs))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Time translating single tables of different sizes, to check that the cost
+per cell stays the same as tables get longer and wider.
+
+    python benchmarks/bench_tables.py [ROWSxCOLUMNS ...]
+
+The project is generated in a temporary directory, the translate time is
+taken from docx-timings.json.
+"""
+from __future__ import print_function
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+from os import path
+
+import docxsphinx
+from docxsphinx import api
+
+CONF = """\
+extensions = ['docxsphinx']
+master_doc = 'index'
+project = 'tables'
+"""
+
+
+def write_project(srcdir, rows, columns):
+    with open(path.join(srcdir, 'conf.py'), 'w') as f:
+        f.write(CONF)
+    with open(path.join(srcdir, 'index.rst'), 'w') as f:
+        f.write('Tables\n======\n\n.. list-table::\n   :header-rows: 1\n\n')
+        for row in range(rows):
+            for column in range(columns):
+                f.write('   {} - Cell {}, {}\n'.format(
+                    '*' if column == 0 else ' ', row, column))
+
+
+def run(rows, columns):
+    tmpdir = tempfile.mkdtemp()
+    try:
+        srcdir = path.join(tmpdir, 'source')
+        outdir = path.join(tmpdir, 'build')
+        os.mkdir(srcdir)
+        write_project(srcdir, rows, columns)
+        docxsphinx.build(srcdir, outdir, status=None)
+        api.clear_cache()
+        with open(path.join(outdir, 'docx-timings.json')) as f:
+            phases = json.load(f)['phases']
+    finally:
+        shutil.rmtree(tmpdir)
+    return phases['translate']['wall']
+
+
+def main(argv):
+    sizes = [tuple(int(n) for n in arg.split('x')) for arg in argv[1:]] or \
+        [(500, 4), (5000, 4), (500, 40)]
+    print('%8s %8s %10s %14s' % ('rows', 'columns', 'translate',
+                                 'ms per 1000'))
+    for rows, columns in sizes:
+        translate = run(rows, columns)
+        print('%8d %8d %9.2fs %14.1f' % (
+            rows, columns, translate,
+            translate * 1000 * 1000 / (rows * columns)))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -52,5 +52,8 @@ setup(
         'sphinx.builders': [
             'docx=docxsphinx',
         ],
+        'console_scripts': [
+            'sphinx-docx-watch=docxsphinx.watch:main',
+        ],
      }
 )
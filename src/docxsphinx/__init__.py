@@ -1,5 +1,27 @@
+__version__ = '0.0.1'
+
+from docxsphinx.api import build
 from docxsphinx.builder import DocxBuilder
+from docxsphinx.images import ImageMetadataCollector
 
 def setup(app):
     app.add_builder(DocxBuilder)
     app.add_config_value('docx_template', None, 'env')
+    app.add_config_value('docx_split', False, '')
+    app.add_config_value('docx_split_master', False, '')
+    app.add_config_value('docx_cache_dir', None, '')
+    app.add_config_value('docx_cache_size', 512, '')
+    app.add_config_value('docx_streaming', False, '')
+    app.add_config_value('docx_table_layout', 'autofit', '')
+    app.add_config_value('docx_trace', False, '', [bool, list, tuple])
+    app.add_config_value('docx_trace_limit', 10000, '')
+    app.add_env_collector(ImageMetadataCollector)
+
+    # The image metadata in the environment is merged by the collector, and
+    # the builder translates in its own worker processes, see
+    # DocxBuilder.write.
+    return {
+        'version': __version__,
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
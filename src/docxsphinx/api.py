@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+    sphinxcontrib-docxapi
+    ~~~~~~~~~~~~~~~~~~~~~~~
+
+    Build docx files from Python, without starting sphinx-build.
+
+    The Sphinx applications are kept between the calls, together with their
+    environment, so building the same project again only reads the changed
+    documents.  The parsed templates and the image metadata are shared by
+    all projects, see DocxBuilder.prepare_writing and docxsphinx.images.
+
+    :license: BSD, see LICENSE for details.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from os import path
+
+from sphinx.application import Sphinx
+from sphinx.util import logging
+
+MAX_APPS = 8
+"Number of Sphinx applications kept for the next build of their project."
+
+_apps = OrderedDict()
+_lock = threading.Lock()
+
+
+def build(srcdir, outdir, doctreedir=None, confdir=None, parallel=0,
+          status=sys.stdout, warning=sys.stderr, **overrides):
+    """
+    Build the docx file(s) of the Sphinx project in *srcdir* into *outdir*.
+
+    *overrides* override the settings in ``conf.py``, like ``-D`` does for
+    sphinx-build.  Pass ``status=None`` to build quietly.  Return the names
+    of the files written, raise the Sphinx exception when the build fails.
+    """
+    srcdir = path.abspath(srcdir)
+    outdir = path.abspath(outdir)
+    doctreedir = path.abspath(doctreedir or path.join(outdir, '.doctrees'))
+    confdir = path.abspath(confdir or srcdir)
+    key = (srcdir, outdir, doctreedir, confdir, parallel, status, warning,
+           repr(sorted(overrides.items())))
+    try:
+        conf_mtime = path.getmtime(path.join(confdir, 'conf.py'))
+    except OSError:
+        conf_mtime = None
+
+    with _lock:
+        app, app_mtime = _apps.pop(key, (None, None))
+    if app is None or app_mtime != conf_mtime:
+        # A new configuration needs a new application.
+        app = Sphinx(srcdir, confdir, outdir, doctreedir, 'docx', overrides,
+                     status, warning, parallel=parallel)
+    else:
+        # The log handlers are global, they may belong to another application.
+        logging.setup(app, app._status, app._warning)
+    app.build()
+    # After a failed build the application is dropped, the environment may
+    # be half updated.
+    with _lock:
+        _apps[key] = (app, conf_mtime)
+        while len(_apps) > MAX_APPS:
+            _apps.popitem(last=False)
+    return [outfilename for outfilename, _ in app.builder.get_targets()]
+
+
+def clear_cache():
+    """Drop the Sphinx applications kept by build()."""
+    with _lock:
+        _apps.clear()
@@ -10,29 +10,253 @@
     :license: BSD, see LICENSE for details.
 """
 
-import codecs
+import logging
+import sys
+import threading
+from hashlib import sha1
 from os import path
 
 from docutils import nodes
-from docutils.io import StringOutput
 
 from sphinx.builders import Builder
+from sphinx.errors import ConfigError
 from sphinx.util.osutil import ensuredir, os_path
-from sphinx.util.nodes import inline_all_toctrees
-from sphinx.util.console import bold, darkgreen, brown
-from docxsphinx.writer import DocxWriter
+from sphinx.util.console import bold, darkgreen
+from sphinx.util.parallel import ParallelTasks, make_chunks
+from docxsphinx import __version__
+from docxsphinx.fragment import FRAGMENT_VERSION, FragmentCache, \
+    FragmentIndex, get_doctree_digest
+from docxsphinx.images import get_image_metadata
+from docxsphinx.timing import PhaseTimer
+
+_writers = {}
+"(template modification time, idle writer) for each template, see get_writer()."
+_writers_lock = threading.Lock()
+
+_log_handler = None
+"Handler writing the docx logger to docx.log, see DocxBuilder.init_log()."
+
+
+class StreamingFragments(object):
+    """
+    Fragments of *docnames*, loaded or translated when they are spliced.
+
+    Only the document being spliced is kept in memory.  The documents are
+    expected to be requested in the order of *docnames*; the doctree or the
+    cached fragment of the next one is loaded by a background thread in the
+    meantime.
+    """
+
+    def __init__(self, builder, docnames):
+        self.builder = builder
+        self.docnames = docnames
+        self.positions = dict((d, i) for i, d in enumerate(docnames))
+        self.prefetched = None
+        "(docname, thread, result) of the document being prefetched."
+
+    def __contains__(self, docname):
+        return docname in self.positions
+
+    def load(self, docname, result, prefetch=False):
+        try:
+            result.append(self.builder.load_document(docname, prefetch))
+        except Exception as exc:
+            result.append(exc)
+
+    def prefetch(self, docname):
+        result = []
+        thread = threading.Thread(target=self.load,
+                                  args=(docname, result, True))
+        thread.daemon = True
+        thread.start()
+        self.prefetched = (docname, thread, result)
+
+    def __getitem__(self, docname):
+        if self.prefetched and self.prefetched[0] == docname:
+            _, thread, result = self.prefetched
+            thread.join()
+        else:
+            result = []
+            self.load(docname, result)
+        self.prefetched = None
+        position = self.positions[docname] + 1
+        if position < len(self.docnames):
+            self.prefetch(self.docnames[position])
+
+        if isinstance(result[0], Exception):
+            raise result[0]
+        mtime, fragment, doctree = result[0]
+        if fragment is None:
+            key, fragment, translated = self.builder.translate_fragment(
+                docname, doctree)
+            if translated:
+                self.builder.info(darkgreen(docname) + " ", nonl=True)
+            self.builder.fragment_index.set_key(docname, mtime, key)
+        self.builder.runs_saved += fragment.runs_saved
+        return fragment
 
 
 class DocxBuilder(Builder):
     name = 'docx'
     format = 'docx'
     out_suffix = '.docx'
+    allow_parallel = True
 
     def init(self):
-        pass
+        if self.config.docx_streaming and sys.version_info < (3, 6):
+            # Writing to a zip file member with ZipFile.open() is new in 3.6.
+            raise ConfigError('docx_streaming needs Python 3.6 or later')
+        self.init_log()
+        self.writer = None
+        self.timer = PhaseTimer()
+        self.runs_saved = 0
+        "Text runs saved in the documents written, see DocxFragment."
+        self.template_mtime = self.get_template_mtime()
+        self.template_stamp = self.get_template_stamp()
+        self.fragment_index = FragmentIndex(
+            path.join(self.doctreedir, 'docx-fragments'), self.template_stamp)
+        cache_dir = self.config.docx_cache_dir
+        if cache_dir is None:
+            cache_dir = path.join(self.doctreedir, 'docx-cache')
+        self.fragment_cache = FragmentCache(
+            path.join(self.confdir, cache_dir),
+            self.config.docx_cache_size * 1024 * 1024)
+        if self.config.docx_trace:
+            # Documents taken from the cache would not be traced.
+            self.fragment_cache.enabled = False
+
+    def init_log(self):
+        """
+        Write the docx logger to docx.log in the output directory, instead
+        of to the file of a previous build in this process.
+        """
+        global _log_handler
+        logger = logging.getLogger('docx')
+        if _log_handler is not None:
+            logger.removeHandler(_log_handler)
+            _log_handler.close()
+        ensuredir(self.outdir)
+        _log_handler = logging.FileHandler(
+            path.join(self.outdir, 'docx.log'), 'w')
+        _log_handler.setFormatter(
+            logging.Formatter('%(asctime)-15s  %(message)s'))
+        logger.addHandler(_log_handler)
+        logger.setLevel(logging.INFO)
+
+    def get_template_mtime(self):
+        dotx = self.config.docx_template
+        try:
+            return dotx and path.getmtime(path.join(self.confdir, dotx))
+        except OSError:
+            return None
+
+    def check_template(self):
+        """
+        Drop the fragment index when the template changed since the last
+        build, for builds in the same process.
+        """
+        mtime = self.get_template_mtime()
+        if mtime == self.template_mtime:
+            return
+        self.template_mtime = mtime
+        self.template_stamp = self.get_template_stamp()
+        self.fragment_index = FragmentIndex(
+            self.fragment_index.dirname, self.template_stamp)
+
+    def get_template_stamp(self):
+        """Identify the template contents and the fragment format."""
+        stamp = [__version__, FRAGMENT_VERSION, self.config.docx_table_layout]
+        dotx = self.config.docx_template
+        if dotx:
+            try:
+                with open(path.join(self.confdir, dotx), 'rb') as f:
+                    stamp.append(sha1(f.read()).hexdigest())
+            except (IOError, OSError):
+                stamp.append(dotx)
+        else:
+            import docx
+            stamp.append('python-docx ' + docx.__version__)
+        return tuple(stamp)
+
+    def get_fragment_key(self, doctree):
+        """
+        Return the cache key for the fragment of *doctree*, built from the
+        doctree and image contents, the template and the docxsphinx version.
+        """
+        key = sha1(repr(self.template_stamp).encode('utf-8'))
+        key.update(get_doctree_digest(doctree).encode('ascii'))
+        for node in doctree.traverse(nodes.image):
+            metadata = get_image_metadata(
+                self.env, doctree.get('docname'), node['uri'])
+            if metadata is not None:
+                key.update(metadata['sha1'].encode('ascii'))
+                continue
+            try:
+                with open(path.join(self.srcdir, node['uri']), 'rb') as f:
+                    key.update(sha1(f.read()).hexdigest().encode('ascii'))
+            except (IOError, OSError):
+                pass
+        return key.hexdigest()
+
+    def get_doctree_mtime(self, docname):
+        return path.getmtime(
+            self.env.doc2path(docname, self.doctreedir, '.doctree'))
+
+    def get_target_filename(self, docname=None):
+        if docname is None:
+            docname = "%s-%s" % (self.config.project, self.config.version)
+        return path.join(self.outdir, os_path(docname) + self.out_suffix)
+
+    def get_targets(self):
+        """
+        Return (output filename, docname) for each docx file to write.
+
+        Normally the master document is written to a single file.  With
+        docx_split, each top level toctree entry gets its own file, and the
+        single file is only written as well when docx_split_master is set.
+        """
+        master = self.config.master_doc
+        targets = []
+        if self.config.docx_split:
+            for docname in self.env.toctree_includes.get(master, []):
+                if docname in self.env.all_docs:
+                    targets.append((self.get_target_filename(docname), docname))
+        if not self.config.docx_split or self.config.docx_split_master:
+            targets.append((self.get_target_filename(), master))
+        return targets
 
     def get_outdated_docs(self):
-        return 'pass'
+        self.check_template()
+        for outfilename, _ in self.get_targets():
+            if not path.isfile(outfilename):
+                return 'all documents'
+        outdated = []
+        for docname in self.env.found_docs:
+            try:
+                mtime = self.get_doctree_mtime(docname)
+            except OSError:
+                mtime = None
+            if self.fragment_index.is_outdated(docname, mtime):
+                outdated.append(docname)
+        return outdated
+
+    def get_toctree_docnames(self):
+        """
+        Return the master document and all documents included by toctrees,
+        in the order in which they appear in the output.
+        """
+        master = self.config.master_doc
+        docnames = []
+        seen = set()
+        stack = [master]
+        while stack:
+            docname = stack.pop()
+            if docname in seen or docname not in self.env.all_docs:
+                continue
+            seen.add(docname)
+            docnames.append(docname)
+            stack.extend(reversed(self.env.toctree_includes.get(docname, [])))
+        return docnames
 
     def get_target_uri(self, docname, typ=None):
         return ''
@@ -51,43 +275,285 @@ class DocxBuilder(Builder):
             if hashindex >= 0:
                 refnode['refuri'] = fname + refuri[hashindex:]
 
+    def get_writer(self):
+        """
+        Return a writer for the template.
+
+        Parsing the template is slow, the writers are kept for the next build
+        in this process, also of other projects, see docxsphinx.watch and
+        docxsphinx.api.
+        """
+        dotx = self.config.docx_template
+        template = dotx and path.join(self.confdir, dotx)
+        with _writers_lock:
+            mtime, writer = _writers.pop(template, (None, None))
+        if writer is None or mtime != self.template_mtime:
+            return self.create_writer()
+        writer.builder = self
+        return writer
+
+    def create_writer(self):
+        # python-docx is only imported once the docx builder is used.
+        from docxsphinx.writer import DocxWriter
+        return DocxWriter(self)
+
+    def put_writer(self, writer):
+        """Keep *writer* for the next build, see get_writer()."""
+        dotx = self.config.docx_template
+        template = dotx and path.join(self.confdir, dotx)
+        writer.reset()
+        with _writers_lock:
+            _writers[template] = (self.template_mtime, writer)
+
     def prepare_writing(self, docnames):
-        self.writer = DocxWriter(self)
+        self.writer = self.get_writer()
 
-    def assemble_doctree(self):
-        master = self.config.master_doc
-        tree = self.env.get_doctree(master)
-        tree = inline_all_toctrees(self, set(), master, tree, darkgreen, [master])
-        tree['docname'] = master
-        self.env.resolve_references(tree, master, self)
-        self.fix_refuris(tree)
-        return tree
+    def load_document(self, docname, prefetch=False):
+        """
+        Return (doctree mtime, cached fragment, doctree) for *docname*.
+
+        The doctree is only loaded when the index or the cache have no
+        fragment for it.  With *prefetch* set the document is loaded while
+        another one is translated, the time is recorded as the prefetch
+        phase so that it does not overlap with the other phases.
+        """
+        if prefetch:
+            cache_phase = read_phase = 'prefetch'
+        else:
+            cache_phase, read_phase = 'cache', 'read'
+        mtime = self.get_doctree_mtime(docname)
+        key = self.fragment_index.get_key(docname, mtime)
+        if key is not None:
+            with self.timer.phase(cache_phase):
+                fragment = self.fragment_cache.get(key)
+            if fragment is not None:
+                return mtime, fragment, None
+        with self.timer.phase(read_phase):
+            return mtime, None, self.env.get_doctree(docname)
+
+    def translate_fragment(self, docname, doctree=None):
+        """
+        Return (cache key, fragment, translated) for *docname*.
+
+        The document is only translated when the cache has no fragment for
+        its contents.
+        """
+        if doctree is None:
+            with self.timer.phase('read'):
+                doctree = self.env.get_doctree(docname)
+        with self.timer.phase('resolve'):
+            doctree['docname'] = docname
+            self.env.resolve_references(doctree, docname, self)
+            self.fix_refuris(doctree)
+        with self.timer.phase('cache'):
+            key = self.get_fragment_key(doctree)
+            fragment = self.fragment_cache.get(key)
+        if fragment is not None:
+            return key, fragment, False
+        with self.timer.phase('translate'):
+            fragment = self.writer.translate_fragment(docname, doctree)
+        with self.timer.phase('cache'):
+            self.fragment_cache.put(key, fragment)
+        return key, fragment, True
+
+    def get_fragments(self, docnames):
+        """
+        Return the fragments of *docnames*.
+
+        Fragments of documents whose doctree did not change since the last
+        build are taken from the cache right away.  The other documents are
+        looked up in the cache by their contents, and only translated when
+        that fails too.  With ``-j N`` this is done in worker processes.
+        """
+        fragments = {}
+        outdated = []
+        for docname in docnames:
+            mtime = self.get_doctree_mtime(docname)
+            fragment = None
+            key = self.fragment_index.get_key(docname, mtime)
+            if key is not None:
+                with self.timer.phase('cache'):
+                    fragment = self.fragment_cache.get(key)
+            if fragment is None:
+                outdated.append((docname, mtime))
+            else:
+                fragments[docname] = fragment
+
+        if self.parallel_ok and len(outdated) > 1:
+            self._translate_parallel(outdated, fragments)
+        else:
+            self._translate_serial(outdated, fragments)
+        self.fragment_index.save()
+        for fragment in fragments.values():
+            self.runs_saved += fragment.runs_saved
+        return fragments
+
+    def _translate_serial(self, outdated, fragments):
+        for docname, mtime in outdated:
+            key, fragment, translated = self.translate_fragment(docname)
+            if translated:
+                self.info(darkgreen(docname) + " ", nonl=True)
+            self.fragment_index.set_key(docname, mtime, key)
+            fragments[docname] = fragment
+
+    def _translate_parallel(self, outdated, fragments):
+        def translate_process(chunk):
+            self.fragment_cache.reset_stats()
+            self.timer.reset()
+            results = [self.translate_fragment(docname)
+                       for docname, _ in chunk]
+            return results, self.fragment_cache.stats, self.timer.phases
+
+        def merge(chunk, returned):
+            results, stats, phases = returned
+            self.fragment_cache.merge_stats(stats)
+            self.timer.merge(phases)
+            for (docname, mtime), (key, fragment, translated) in \
+                    zip(chunk, results):
+                if translated:
+                    self.info(darkgreen(docname) + " ", nonl=True)
+                self.fragment_index.set_key(docname, mtime, key)
+                fragments[docname] = fragment
+
+        tasks = ParallelTasks(self.app.parallel)
+        for chunk in make_chunks(outdated, self.app.parallel):
+            tasks.add_task(translate_process, chunk, merge)
+        tasks.join()
 
     def write(self, *ignored):
-        docnames = self.env.all_docs
+        self.timer.reset()
+        self.runs_saved = 0
+        docnames = self.get_toctree_docnames()
 
         self.info(bold('preparing documents... '), nonl=True)
-        self.prepare_writing(docnames)
+        with self.timer.phase('prepare'):
+            self.prepare_writing(docnames)
         self.info('done')
 
-        self.info(bold('assembling single document... '), nonl=True)
-        doctree = self.assemble_doctree()
+        targets = self.get_targets()
+        if len(targets) == 1 and not self.parallel_ok and \
+                self.config.docx_streaming:
+            # Only one document at a time is in memory.
+            outfilename, docname = targets[0]
+            self.info(bold('translating and writing... '), nonl=True)
+            self.stream_doc(outfilename, docname,
+                            StreamingFragments(self, docnames), self.writer)
+            self.fragment_index.save()
+            self.info()
+            return
+        if len(targets) == 1 and not self.parallel_ok:
+            outfilename, docname = targets[0]
+            self.info(bold('translating outdated documents... '), nonl=True)
+            with self.timer.phase('assemble'):
+                self.writer.assemble(docname, StreamingFragments(self, docnames))
+            self.fragment_index.save()
+            self.info()
+            self.info(bold('writing... '), nonl=True)
+            self.save_doc(outfilename, self.writer)
+            self.info('done')
+            return
+
+        self.info(bold('translating outdated documents... '), nonl=True)
+        fragments = self.get_fragments(docnames)
         self.info()
-        self.info(bold('writing... '), nonl=True)
-        docname = "%s-%s" % (self.config.project, self.config.version)
-        self.write_doc(docname, doctree)
-        self.info('done')
 
-    def write_doc(self, docname, doctree):
-        destination = StringOutput(encoding='utf-8')
-        self.writer.write(doctree, destination)
-        outfilename = path.join(
-                self.outdir, os_path(docname) + self.out_suffix)
+        if len(targets) == 1:
+            self.info(bold('writing... '), nonl=True)
+            outfilename, docname = targets[0]
+            self.write_doc(outfilename, docname, fragments, self.writer)
+            self.info('done')
+        else:
+            self.info(bold('writing chapters... '), nonl=True)
+            if self.parallel_ok:
+                self._write_parallel(targets, fragments)
+            else:
+                self._write_serial(targets, fragments)
+            self.info()
+
+    def _write_serial(self, targets, fragments):
+        for outfilename, docname in targets:
+            self.info(darkgreen(docname) + " ", nonl=True)
+            self.write_doc(outfilename, docname, fragments,
+                           self.create_writer(), copy=True)
+
+    def _write_parallel(self, targets, fragments):
+        # The forked workers get their own copy of the fragments, they can
+        # be spliced without copying.
+        def write_process(chunk):
+            self.timer.reset()
+            for outfilename, docname in chunk:
+                self.write_doc(outfilename, docname, fragments,
+                               self.create_writer())
+            return self.timer.phases
+
+        def finished(chunk, phases):
+            self.timer.merge(phases)
+            for _, docname in chunk:
+                self.info(darkgreen(docname) + " ", nonl=True)
+
+        tasks = ParallelTasks(self.app.parallel)
+        for chunk in make_chunks(targets, self.app.parallel):
+            tasks.add_task(write_process, chunk, finished)
+        tasks.join()
+
+    def write_doc(self, outfilename, docname, fragments, writer, copy=False):
+        """
+        Write *docname*, and the documents in its toctrees, to *outfilename*.
+        """
+        if self.config.docx_streaming:
+            self.stream_doc(outfilename, docname, fragments, writer, copy)
+            return
+        with self.timer.phase('assemble'):
+            writer.assemble(docname, fragments, copy=copy)
+        self.save_doc(outfilename, writer)
+
+    def stream_doc(self, outfilename, docname, fragments, writer, copy=False):
+        """
+        Write *docname* like write_doc(), but stream the body to the file
+        while it is assembled, see DocxWriter.streaming().
+        """
+        ensuredir(path.dirname(outfilename))
+        try:
+            with self.timer.phase('save'):
+                with writer.streaming(outfilename):
+                    with self.timer.phase('assemble'):
+                        writer.assemble(docname, fragments, copy=copy)
+        except (IOError, OSError) as err:
+            self.warn("error writing file %s: %s" % (outfilename, err))
+
+    def save_doc(self, outfilename, writer):
         ensuredir(path.dirname(outfilename))
         try:
-            self.writer.save(outfilename)
+            with self.timer.phase('save'):
+                writer.save(outfilename)
         except (IOError, OSError) as err:
             self.warn("error writing file %s: %s" % (outfilename, err))
 
     def finish(self):
-        pass
+        self.info(bold('fragment cache... '), nonl=True)
+        stats = self.fragment_cache.stats
+        message = '%d hits, %d misses, %d KiB read, %d KiB written' % (
+            stats['hits'], stats['misses'], stats['read'] // 1024,
+            stats['written'] // 1024)
+        if stats['written']:
+            # Walking the cache is only needed when it may have grown.
+            size = self.fragment_cache.evict()
+            message += ', %d KiB in cache, %d evicted' % (
+                size // 1024, stats['evicted'])
+        self.info(message)
+
+        self.info(bold('text runs... '), nonl=True)
+        self.info('%d saved by joining text with the same formatting' %
+                  self.runs_saved)
+
+        self.info(bold('phase timings:'))
+        for line in self.timer.report():
+            self.info('    ' + line)
+        self.timer.dump(path.join(self.outdir, 'docx-timings.json'),
+                        parallel=self.app.parallel if self.parallel_ok else 1,
+                        cache=stats, runs_saved=self.runs_saved)
+        self.fragment_cache.reset_stats()
+
+        if self.writer is not None:
+            self.put_writer(self.writer)
+            self.writer = None
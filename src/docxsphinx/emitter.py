@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+    sphinxcontrib-docxemitter
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Paragraphs and runs built directly as XML elements.
+
+    The python-docx proxies (Paragraph, Run, ParagraphFormat, ...) are made
+    anew for every call and search the XML they change every time.  The
+    translator builds the elements itself instead, with the same result.
+    The elements are made through their parent, so they are still those of
+    python-docx (CT_P, CT_R, ...), and python-docx keeps managing the parts
+    of the package.
+
+    Paragraph and run properties are built once for every combination that
+    is used, and copied onto each new paragraph and run.
+
+    :license: BSD, see LICENSE for details.
+"""
+
+import re
+from copy import deepcopy
+
+from docx.oxml.ns import qn
+
+W_P = qn('w:p')
+W_PPR = qn('w:pPr')
+W_PSTYLE = qn('w:pStyle')
+W_IND = qn('w:ind')
+W_JC = qn('w:jc')
+W_R = qn('w:r')
+W_RPR = qn('w:rPr')
+W_RSTYLE = qn('w:rStyle')
+W_RFONTS = qn('w:rFonts')
+W_B = qn('w:b')
+W_I = qn('w:i')
+W_VERTALIGN = qn('w:vertAlign')
+W_T = qn('w:t')
+W_TAB = qn('w:tab')
+W_BR = qn('w:br')
+W_SECTPR = qn('w:sectPr')
+W_TR = qn('w:tr')
+W_TC = qn('w:tc')
+W_TCPR = qn('w:tcPr')
+W_TCW = qn('w:tcW')
+W_GRIDSPAN = qn('w:gridSpan')
+W_VMERGE = qn('w:vMerge')
+W_GRIDCOL = qn('w:gridCol')
+W_TBLGRID = qn('w:tblGrid')
+W_TBLW = qn('w:tblW')
+W_VAL = qn('w:val')
+W_W = qn('w:w')
+W_TYPE = qn('w:type')
+W_LEFT = qn('w:left')
+W_ASCII = qn('w:ascii')
+W_HANSI = qn('w:hAnsi')
+XML_SPACE = qn('xml:space')
+
+_PPR_ORDER = (W_PSTYLE, W_IND, W_JC)
+"Order of the paragraph properties set here, as required by the schema."
+
+_special_re = re.compile(r'([\t\r\n])')
+
+
+def add_block(parent, element):
+    """
+    Add the block level *element* (paragraph or table) at the end of
+    *parent*, a body or a table cell.  The section properties stay last.
+
+    python-docx searches the body for the section properties on every
+    insert, which makes building a long document quadratic.  Only the last
+    child is looked at here, so adding a block takes constant time.
+    """
+    last = next(parent.iterchildren(reversed=True), None)
+    if last is not None and last.tag == W_SECTPR:
+        last.addprevious(element)
+    else:
+        parent.append(element)
+    return element
+
+
+def remove_block(parent, element):
+    """
+    Remove the block level *element* from *parent*.
+
+    lxml takes time quadratic in the size of an element to detach it, which
+    makes a long table as slow as a whole document.  The children of the
+    element are detached one at a time first, and put back after.
+    """
+    children = list(element)
+    for child in children:
+        element.remove(child)
+    parent.remove(element)
+    element.extend(children)
+
+
+def get_last_block(parent):
+    """Return the last block level element of *parent*, or None."""
+    last = next(parent.iterchildren(reversed=True), None)
+    if last is not None and last.tag == W_SECTPR:
+        last = last.getprevious()
+    return last
+
+
+def iter_blocks_after(parent, block):
+    """
+    Iterate over the block level elements of *parent* after *block*, or
+    all of them when *block* is None.
+    """
+    if block is None:
+        siblings = parent.iterchildren()
+    else:
+        siblings = block.itersiblings()
+    for element in siblings:
+        if element.tag != W_SECTPR:
+            yield element
+
+
+def add_paragraph(parent, pPr=None):
+    """
+    Add an empty paragraph at the end of *parent*, see add_block(), with a
+    copy of the paragraph properties *pPr*.
+    """
+    p = parent.makeelement(W_P)
+    if pPr is not None:
+        p.append(deepcopy(pPr))
+    return add_block(parent, p)
+
+
+def add_grid_columns(tbl, widths):
+    """
+    Add grid columns of *widths* (in twips, as strings) to the table *tbl*,
+    which has no rows yet.
+
+    Table.add_column of python-docx adds a cell to every row as well.
+    """
+    tblGrid = tbl.find(W_TBLGRID)
+    for width in widths:
+        tblGrid.append(tblGrid.makeelement(W_GRIDCOL, {W_W: width}))
+
+
+def set_fixed_layout(tbl, width):
+    """
+    Give the table *tbl* a fixed layout, with the total *width* (in twips,
+    as a string).  Word uses the widths of the grid and cells as they are,
+    instead of fitting the columns to their content.
+    """
+    tblPr = tbl.tblPr
+    tblPr.autofit = False
+    # Tables made by python-docx always have a w:tblW, of type auto.
+    tblW = tblPr.find(W_TBLW)
+    tblW.set(W_TYPE, 'dxa')
+    tblW.set(W_W, width)
+
+
+def make_row(tbl, widths, spans=(), merges=()):
+    """
+    Return a row for the table *tbl*, with a cell for each of the column
+    *widths* (in twips, as strings, or None), holding an empty paragraph.
+
+    The first cells span the number of columns in *spans*, written as a
+    w:gridSpan with the width of the columns spanned.  Merging the cells
+    afterwards with python-docx moves their content and resizes the row
+    for every column.  Cells spanning rows have the w:vMerge value in
+    *merges*, 'restart' in the first row and 'continue' in the others.
+
+    The row is not added to the table, see copy_row().
+    """
+    tr = tbl.makeelement(W_TR)
+    spans = list(spans)
+    spans.extend([1] * (len(widths) - sum(spans)))
+    merges = list(merges) + [None] * (len(spans) - len(merges))
+    column = 0
+    for span, merge in zip(spans, merges):
+        spanned = widths[column:column + span]
+        column += span
+        tc = tr.makeelement(W_TC)
+        tr.append(tc)
+        tcPr = tc.makeelement(W_TCPR)
+        if None not in spanned:
+            width = str(sum(int(w) for w in spanned))
+            tcPr.append(tcPr.makeelement(W_TCW, {W_TYPE: 'dxa', W_W: width}))
+        if span > 1:
+            tcPr.append(tcPr.makeelement(W_GRIDSPAN, {W_VAL: str(span)}))
+        if merge == 'restart':
+            tcPr.append(tcPr.makeelement(W_VMERGE, {W_VAL: merge}))
+        elif merge == 'continue':
+            # The default value, python-docx leaves it out as well.
+            tcPr.append(tcPr.makeelement(W_VMERGE))
+        if len(tcPr):
+            tc.append(tcPr)
+        tc.append(tc.makeelement(W_P))
+    return tr
+
+
+def copy_row(tbl, prototype):
+    """
+    Add a copy of the row *prototype* (see make_row()) at the end of the
+    table *tbl*.  Copying a row is faster than building it again.
+    """
+    tr = deepcopy(prototype)
+    tbl.append(tr)
+    return tr
+
+
+def make_paragraph_properties(parent, style_id=None, alignment=None,
+                              left_indent=None):
+    """
+    Return a w:pPr with the style *style_id*, *alignment* and *left_indent*
+    (in twips), to copy onto paragraphs.  *parent* is any element of the
+    document.
+    """
+    pPr = parent.makeelement(W_PPR)
+    if style_id is not None:
+        pPr.append(pPr.makeelement(W_PSTYLE, {W_VAL: style_id}))
+    if left_indent is not None:
+        pPr.append(pPr.makeelement(W_IND, {W_LEFT: str(left_indent)}))
+    if alignment is not None:
+        pPr.append(pPr.makeelement(W_JC, {W_VAL: alignment}))
+    return pPr
+
+
+def set_paragraph_properties(p, pPr):
+    """Set the properties in *pPr* on paragraph *p*, keeping the others."""
+    if not len(p) or p[0].tag != W_PPR:
+        p.insert(0, deepcopy(pPr))
+        return
+    for element in pPr:
+        for name, value in element.items():
+            _set_property(p, element.tag, name, value)
+
+
+def get_paragraph_properties(p):
+    """Return the w:pPr of paragraph *p*, adding an empty one if needed."""
+    if len(p) and p[0].tag == W_PPR:
+        return p[0]
+    pPr = p.makeelement(W_PPR)
+    p.insert(0, pPr)
+    return pPr
+
+
+def _set_property(p, tag, name, value):
+    pPr = get_paragraph_properties(p)
+    element = pPr.find(tag)
+    if element is None:
+        element = pPr.makeelement(tag)
+        successors = _PPR_ORDER[_PPR_ORDER.index(tag) + 1:]
+        for child in pPr:
+            if child.tag in successors:
+                child.addprevious(element)
+                break
+        else:
+            pPr.append(element)
+    element.set(name, value)
+
+
+def set_style(p, style_id):
+    """
+    Set the style of paragraph *p* to *style_id*, None for the default
+    style.  Like python-docx, the paragraph gets a w:pPr either way.
+    """
+    pPr = get_paragraph_properties(p)
+    if style_id is None:
+        pStyle = pPr.find(W_PSTYLE)
+        if pStyle is not None:
+            pPr.remove(pStyle)
+    else:
+        _set_property(p, W_PSTYLE, W_VAL, style_id)
+
+
+def make_run_properties(parent, style_id=None, font=None, bold=False,
+                        italic=False, vert_align=None):
+    """
+    Return a w:rPr with the character style *style_id*, *font*, *bold*,
+    *italic* and *vert_align* ('subscript' or 'superscript'), to copy onto
+    runs, or None when there is nothing to set.  *parent* is any element of
+    the document.
+    """
+    rPr = parent.makeelement(W_RPR)
+    if style_id is not None:
+        rPr.append(rPr.makeelement(W_RSTYLE, {W_VAL: style_id}))
+    if font is not None:
+        rPr.append(rPr.makeelement(W_RFONTS, {W_ASCII: font, W_HANSI: font}))
+    if bold:
+        rPr.append(rPr.makeelement(W_B))
+    if italic:
+        rPr.append(rPr.makeelement(W_I))
+    if vert_align is not None:
+        rPr.append(rPr.makeelement(W_VERTALIGN, {W_VAL: vert_align}))
+    if not len(rPr):
+        return None
+    return rPr
+
+
+def add_run(p, text='', rPr=None):
+    """
+    Add a run with *text* at the end of paragraph *p*, with a copy of the
+    run properties *rPr*.
+    """
+    r = p.makeelement(W_R)
+    p.append(r)
+    if rPr is not None:
+        r.append(deepcopy(rPr))
+    if text:
+        add_text(r, text)
+    return r
+
+
+def add_text(r, text):
+    """
+    Add *text* at the end of run *r*, like python-docx does: tabs and line
+    breaks become w:tab and w:br, the text in between w:t.
+    """
+    if '\t' in text or '\n' in text or '\r' in text:
+        pieces = _special_re.split(text)
+    else:
+        pieces = [text]
+    for piece in pieces:
+        if not piece:
+            continue
+        if piece == '\t':
+            r.append(r.makeelement(W_TAB))
+        elif piece in '\r\n':
+            r.append(r.makeelement(W_BR))
+        else:
+            t = r.makeelement(W_T)
+            t.text = piece
+            if len(piece.strip()) < len(piece):
+                t.set(XML_SPACE, 'preserve')
+            r.append(t)
+
+
+def get_text(p):
+    """Return the text of the runs of paragraph *p*, like python-docx does."""
+    text = []
+    for child in p.iterchildren(W_R):
+        for element in child:
+            if element.tag == W_T:
+                text.append(element.text or '')
+            elif element.tag == W_TAB:
+                text.append('\t')
+            elif element.tag == W_BR:
+                text.append('\n')
+    return ''.join(text)
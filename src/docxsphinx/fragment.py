@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+    sphinxcontrib-docxfragment
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Translated documents, kept apart from the final docx container so they
+    can be reused between builds.
+
+    :license: BSD, see LICENSE for details.
+"""
+
+import base64
+import json
+import os
+import pickle
+import re
+import threading
+from hashlib import sha1
+from os import path
+
+from docutils import nodes
+from sphinx.util.osutil import ensuredir
+
+FRAGMENT_VERSION = 5
+"Bump whenever the translation output changes, to invalidate stored fragments."
+
+_seq_re = re.compile(r'\s*SEQ\s+(\S+)')
+
+
+class DocxFragment(object):
+    """
+    The translated body of a single document.
+
+    Toctrees are not inlined, ``toctrees`` records where the body of each
+    included document has to be spliced in.
+    """
+
+    def __init__(self, docname, elements, images, toctrees, runs_saved=0):
+        self.docname = docname
+        self.elements = elements
+        "Top level body elements (paragraphs and tables)."
+        self.images = images
+        "(SHA1, blob) of the images, keyed by the relationship id used."
+        self.toctrees = toctrees
+        "List of (position, includefiles), position indexes self.elements."
+        self.runs_saved = runs_saved
+        "Number of text runs saved by joining text with the same formatting."
+
+    def __getstate__(self):
+        from lxml import etree
+        state = self.__dict__.copy()
+        state['elements'] = [etree.tostring(e) for e in self.elements]
+        return state
+
+    def __setstate__(self, state):
+        from docx.oxml import parse_xml
+        state['elements'] = [parse_xml(e) for e in state['elements']]
+        self.__dict__.update(state)
+
+    def dumps(self):
+        """
+        Return the fragment as JSON, with the elements as XML text and the
+        images encoded in base64.  Unlike a pickle, loading it can only
+        ever produce a fragment.
+        """
+        from lxml import etree
+        images = dict((rid, [sha1, base64.b64encode(blob).decode('ascii')])
+                      for rid, (sha1, blob) in self.images.items())
+        return json.dumps({
+            'docname': self.docname,
+            'elements': [etree.tostring(e, encoding='unicode')
+                         for e in self.elements],
+            'images': images,
+            'toctrees': self.toctrees,
+            'runs_saved': self.runs_saved,
+        }).encode('utf-8')
+
+    @classmethod
+    def loads(cls, data):
+        """Return the fragment written by dumps() to *data*."""
+        from docx.oxml import parse_xml
+        state = json.loads(data.decode('utf-8'))
+        return cls(state['docname'],
+                   [parse_xml(e) for e in state['elements']],
+                   dict((rid, (sha1, base64.b64decode(blob)))
+                        for rid, (sha1, blob) in state['images'].items()),
+                   [(position, includefiles)
+                    for position, includefiles in state['toctrees']],
+                   state['runs_saved'])
+
+
+def renumber_seq_fields(element, counters):
+    """
+    Renumber the results of the SEQ fields in *element*.
+
+    Each document numbers its own captions starting from one, *counters*
+    keeps the last number used per sequence across the spliced documents.
+    """
+    from docx.oxml.ns import qn
+    sequence = None
+    in_result = False
+    for child in element.iter(qn('w:fldChar'), qn('w:instrText'), qn('w:t')):
+        if child.tag == qn('w:instrText'):
+            match = _seq_re.match(child.text or '')
+            if match:
+                sequence = match.group(1)
+        elif child.tag == qn('w:fldChar'):
+            in_result = (sequence is not None and
+                         child.get(qn('w:fldCharType')) == 'separate')
+            if child.get(qn('w:fldCharType')) == 'end':
+                sequence = None
+        elif in_result and (child.text or '').isdigit():
+            counters[sequence] = counters.get(sequence, 0) + 1
+            child.text = str(counters[sequence])
+            in_result = False
+
+
+def get_doctree_digest(doctree):
+    """
+    Return a digest of the content of *doctree*.
+
+    Source file names are left out, so the digest does not depend on where
+    the project is checked out.
+    """
+    digest = sha1()
+    for node in doctree.traverse():
+        if isinstance(node, nodes.Text):
+            digest.update(b'T' + node.astext().encode('utf-8'))
+            continue
+        attributes = sorted((k, v) for k, v in node.attributes.items()
+                            if k != 'source')
+        digest.update(repr((node.__class__.__name__, len(node.children),
+                            attributes)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class FragmentIndex(object):
+    """
+    The cache key of the fragment of each document in the previous build.
+
+    A key is reused as long as the doctree it was computed from has not
+    been written again.  The index is invalidated as a whole when *stamp*
+    (template and fragment format) changes.
+    """
+
+    def __init__(self, dirname, stamp):
+        self.dirname = dirname
+        self.stamp = stamp
+        self.keys = {}
+        "(doctree modification time, cache key) for each document."
+        self.load()
+
+    @property
+    def filename(self):
+        return path.join(self.dirname, 'index.pickle')
+
+    def load(self):
+        try:
+            with open(self.filename, 'rb') as f:
+                stamp, keys = pickle.load(f)
+        except (IOError, OSError, EOFError, ValueError, pickle.PickleError):
+            return
+        if stamp == self.stamp:
+            self.keys = keys
+
+    def save(self):
+        ensuredir(self.dirname)
+        with open(self.filename, 'wb') as f:
+            pickle.dump((self.stamp, self.keys), f, pickle.HIGHEST_PROTOCOL)
+
+    def is_outdated(self, docname, mtime):
+        return self.get_key(docname, mtime) is None
+
+    def get_key(self, docname, mtime):
+        stored_mtime, key = self.keys.get(docname, (None, None))
+        if stored_mtime != mtime:
+            return None
+        return key
+
+    def set_key(self, docname, mtime, key):
+        self.keys[docname] = (mtime, key)
+
+
+class FragmentCache(object):
+    """
+    Content addressed on-disk cache of fragments.
+
+    The cache does not depend on the location of the project, so it can be
+    shared between checkouts and build machines.  Every use of an entry
+    updates its modification time, when the cache grows beyond *max_size*
+    bytes the least recently used entries are removed.
+    """
+
+    def __init__(self, dirname, max_size):
+        self.dirname = dirname
+        self.max_size = max_size
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.enabled = True
+        "False to neither read nor write entries."
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats.update(hits=0, misses=0, read=0, written=0, evicted=0)
+
+    def merge_stats(self, stats):
+        with self.lock:
+            for name, value in stats.items():
+                self.stats[name] += value
+
+    def get_filename(self, key):
+        return path.join(self.dirname, key[:2], key + '.json')
+
+    def get(self, key):
+        from lxml import etree
+        if not self.enabled:
+            return None
+        filename = self.get_filename(key)
+        try:
+            with open(filename, 'rb') as f:
+                data = f.read()
+            fragment = DocxFragment.loads(data)
+            os.utime(filename, None)
+        except (IOError, OSError, ValueError, KeyError, TypeError,
+                AttributeError, etree.XMLSyntaxError):
+            # Shared entries may also be malformed.
+            self.merge_stats(dict(misses=1))
+            return None
+        self.merge_stats(dict(hits=1, read=len(data)))
+        return fragment
+
+    def put(self, key, fragment):
+        if not self.enabled:
+            return
+        filename = self.get_filename(key)
+        data = fragment.dumps()
+        ensuredir(path.dirname(filename))
+        # Write under a temporary name first, other builds may be reading
+        # from a shared cache.
+        tmpname = '%s.%d.tmp' % (filename, os.getpid())
+        with open(tmpname, 'wb') as f:
+            f.write(data)
+        try:
+            os.rename(tmpname, filename)
+        except OSError:
+            os.remove(tmpname)
+        self.merge_stats(dict(written=len(data)))
+
+    def evict(self):
+        """
+        Remove the least recently used entries, down to max_size, and return
+        the size of the cache.  This walks the whole cache, so it is only
+        worth doing after entries were written.
+        """
+        entries = []
+        size = 0
+        for dirpath, _, filenames in os.walk(self.dirname):
+            for filename in filenames:
+                filename = path.join(dirpath, filename)
+                try:
+                    st = os.stat(filename)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, filename))
+                size += st.st_size
+        entries.sort()
+        for _, entry_size, filename in entries:
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(filename)
+            except OSError:
+                continue
+            size -= entry_size
+            self.stats['evicted'] += 1
+        return size
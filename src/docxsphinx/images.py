@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+    sphinxcontrib-docximages
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Metadata of the images referenced by the documents.
+
+    python-docx reads, parses and hashes every image it embeds.  The metadata
+    it needs is collected while Sphinx reads the documents instead, in the
+    worker processes with ``-j N``, so the writer only has to read the image
+    files it actually embeds.
+
+    :license: BSD, see LICENSE for details.
+"""
+
+import logging
+import os
+from os import path
+
+from docutils import nodes
+from sphinx.environment.collectors import EnvironmentCollector
+
+logger = logging.getLogger('docx')
+
+_metadata = {}
+"(modification time, size, metadata) of the images read in this process."
+
+
+def read_image_metadata(filename):
+    """Return the metadata python-docx needs to embed the image *filename*."""
+    st = os.stat(filename)
+    mtime, size, metadata = _metadata.get(filename, (None, None, None))
+    if (mtime, size) == (st.st_mtime, st.st_size):
+        return metadata
+    from docx.image.image import Image
+    image = Image.from_file(filename)
+    metadata = dict(filename=image.filename, ext=image.ext,
+                    content_type=image.content_type,
+                    px_width=image.px_width, px_height=image.px_height,
+                    horz_dpi=image.horz_dpi, vert_dpi=image.vert_dpi,
+                    size=len(image.blob), sha1=image.sha1)
+    _metadata[filename] = (st.st_mtime, st.st_size, metadata)
+    return metadata
+
+
+def get_image_metadata(env, docname, uri):
+    """Return the metadata of image *uri* in *docname*, or None."""
+    return getattr(env, 'docx_images', {}).get(docname, {}).get(uri)
+
+
+class ImageHeader(object):
+    """The image header python-docx would parse, made from the metadata."""
+
+    def __init__(self, metadata):
+        self.content_type = metadata['content_type']
+        self.default_ext = metadata['ext']
+        self.px_width = metadata['px_width']
+        self.px_height = metadata['px_height']
+        self.horz_dpi = metadata['horz_dpi']
+        self.vert_dpi = metadata['vert_dpi']
+
+
+def load_image(filename, metadata):
+    """Return a python-docx Image of *filename*, without parsing it."""
+    from docx.image.image import Image
+    with open(filename, 'rb') as f:
+        blob = f.read()
+    return Image(blob, metadata['filename'], ImageHeader(metadata))
+
+
+class ImageMetadataCollector(EnvironmentCollector):
+    """Store the metadata of the images of each document in env.docx_images."""
+
+    def clear_doc(self, app, env, docname):
+        getattr(env, 'docx_images', {}).pop(docname, None)
+
+    def merge_other(self, app, env, docnames, other):
+        if not hasattr(env, 'docx_images'):
+            env.docx_images = {}
+        images = getattr(other, 'docx_images', {})
+        for docname in docnames:
+            if docname in images:
+                env.docx_images[docname] = images[docname]
+
+    def process_doc(self, app, doctree):
+        if app.builder.name != 'docx':
+            return
+        from docx.image.exceptions import UnrecognizedImageError
+        env = app.env
+        if not hasattr(env, 'docx_images'):
+            env.docx_images = {}
+        images = {}
+        for node in doctree.traverse(nodes.image):
+            # Only local images with a single candidate, see ImageCollector.
+            uri = node.get('candidates', {}).get('*')
+            if uri is None or uri in images:
+                continue
+            try:
+                images[uri] = read_image_metadata(path.join(env.srcdir, uri))
+            except (IOError, OSError, UnrecognizedImageError) as exc:
+                # The writer reports the error when it embeds the image.
+                logger.info('no metadata for image {}: {}'.format(uri, exc))
+        env.docx_images[env.docname] = images
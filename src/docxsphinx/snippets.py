@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+    sphinxcontrib-docxsnippets
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Pre-parsed pieces of OOXML for structures used over and over, like
+    fields and bookmarks.
+
+    A snippet is parsed once.  Each use copies it in one go and fills in its
+    slots, instead of building every element and attribute in Python.
+
+    :license: BSD, see LICENSE for details.
+"""
+
+import re
+from copy import deepcopy
+
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+
+W_T = qn('w:t')
+XML_SPACE = qn('xml:space')
+
+_slot_re = re.compile(r'^\{(\w+)\}$')
+
+
+class Snippet(object):
+    """
+    A sequence of sibling elements, written as *xml* with the ``w`` and
+    ``r`` prefixes.  A text or attribute value that is just ``{name}`` is a
+    slot, filled in by the keyword argument *name* of clone().
+    """
+
+    def __init__(self, xml):
+        self.container = parse_xml('<w:snippet {}>{}</w:snippet>'.format(
+            nsdecls('w', 'r'), xml))
+        self.slots = []
+        "(path of child indexes, attribute or None for text, slot name)."
+        self._find_slots(self.container, ())
+
+    def _find_slots(self, element, path):
+        match = _slot_re.match(element.text or '')
+        if match:
+            self.slots.append((path, None, match.group(1)))
+        for name, value in element.items():
+            match = _slot_re.match(value)
+            if match:
+                self.slots.append((path, name, match.group(1)))
+        for index, child in enumerate(element):
+            self._find_slots(child, path + (index,))
+
+    def clone(self, **values):
+        """Return a copy of the elements, with the slots filled in."""
+        container = deepcopy(self.container)
+        for path, attribute, name in self.slots:
+            element = container
+            for index in path:
+                element = element[index]
+            value = str(values[name])
+            if attribute is not None:
+                element.set(attribute, value)
+                continue
+            element.text = value
+            if element.tag == W_T and len(value.strip()) < len(value):
+                element.set(XML_SPACE, 'preserve')
+        return list(container)
+
+    def append_to(self, parent, **values):
+        """Add a copy of the elements at the end of *parent*, see clone()."""
+        parent.extend(self.clone(**values))
+
+
+_FIELD_XML = (
+    '<w:r><w:fldChar w:fldCharType="begin"/></w:r>'
+    '<w:r><w:instrText xml:space="preserve">{instruction}</w:instrText></w:r>'
+    '<w:r><w:fldChar w:fldCharType="separate"/></w:r>'
+    '<w:r><w:t>{result}</w:t></w:r>'
+    '<w:r><w:fldChar w:fldCharType="end"/></w:r>')
+
+FIELD = Snippet(_FIELD_XML)
+"""
+The runs of a complex field, e.g. SEQ, REF, PAGEREF, TOC or XE, with the
+field *instruction* and the *result* shown until the field is updated.
+"""
+
+CAPTION = Snippet('<w:r><w:t>{label}</w:t></w:r>' + _FIELD_XML +
+                  '<w:r><w:t>{separator}</w:t></w:r>')
+"The runs of a caption number: *label*, a FIELD and *separator*."
+
+PAGE_BREAK = Snippet('<w:r><w:br w:type="page"/></w:r>')
+"A run with a page break."
+
+BOOKMARK = Snippet('<w:bookmarkStart w:id="{id}" w:name="{name}"/>'
+                   '<w:bookmarkEnd w:id="{id}"/>')
+"An empty bookmark *name*, *id* must be unique in the document."
+
+
+def seq_instruction(sequence):
+    """Return the instruction of a SEQ field numbering *sequence*."""
+    return ' SEQ {} \\* ARABIC '.format(sequence)
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+    sphinxcontrib-docxstyles
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Style lookup for the translator.
+
+    :license: BSD, see LICENSE for details.
+"""
+
+import logging
+
+from docx.styles import BabelFish
+
+logger = logging.getLogger('docx')
+
+
+class StyleResolver(object):
+    """
+    The style ids of the styles of a template, by name and type.
+
+    python-docx searches the styles part for every style it looks up by
+    name.  The styles part is read once instead, and every lookup is kept,
+    including those of missing styles.  Like python-docx, a name that is
+    not found is tried as a style id, and the default style of a type has
+    no id.
+    """
+
+    def __init__(self, styles):
+        self.by_name = {}
+        self.by_id = {}
+        self.defaults = {}
+        for style in styles.element.style_lst:
+            self.by_name.setdefault(style.name_val, style)
+            self.by_id.setdefault(style.styleId, style)
+            if style.default:
+                # The last default of a type counts.
+                self.defaults[style.type] = style
+        self.ids = {}
+        "The id, or False when missing, for each (name, style type)."
+        self.warned = set()
+        "The missing styles that have been warned about."
+
+    def reset(self):
+        """Warn again about missing styles, for the next build."""
+        self.warned.clear()
+
+    def lookup(self, name, style_type):
+        key = (name, style_type)
+        if key not in self.ids:
+            style = self.by_name.get(BabelFish.ui2internal(name))
+            if style is None:
+                style = self.by_id.get(name)
+            if style is None or style.type != style_type:
+                self.ids[key] = False
+            elif style is self.defaults.get(style_type):
+                self.ids[key] = None
+            else:
+                self.ids[key] = style.styleId
+        return self.ids[key]
+
+    def is_missing(self, name, style_type):
+        """Return whether there is no style *name*, warning once if so."""
+        if self.lookup(name, style_type) is not False:
+            return False
+        if name not in self.warned:
+            self.warned.add(name)
+            logger.warning('looks like style "{}" is missing, '
+                           'using no style'.format(name))
+        return True
+
+    def get_style_id(self, name, style_type):
+        """
+        Return the id of style *name*, None for the default style of the
+        type, or when *name* is None or missing.
+        """
+        if name is None or self.is_missing(name, style_type):
+            return None
+        return self.lookup(name, style_type)
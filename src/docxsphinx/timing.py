@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+    sphinxcontrib-docxtiming
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Wall clock time, CPU time and memory of the phases of a docx build.
+
+    :license: BSD, see LICENSE for details.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def get_cpu_time():
+    """
+    Return the CPU time of the current thread, or of the whole process
+    before Python 3.7.
+    """
+    if hasattr(time, 'thread_time'):
+        return time.thread_time()
+    times = os.times()
+    return times[0] + times[1]
+
+
+def get_peak_rss():
+    """Return the peak resident set size of this process in bytes, or 0."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak
+    return peak * 1024
+
+
+def get_rss():
+    """
+    Return the current resident set size of this process in bytes, or 0
+    where /proc is not available.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError, IndexError, AttributeError):
+        return 0
+
+
+class PhaseTimer(object):
+    """
+    Accumulate the cost of each build phase.
+
+    A phase can be entered several times, e.g. once per document; wall and
+    CPU time are summed, and so is rss_growth, the growth of the resident
+    set size during the phase.  CPU time is that of the thread running the
+    phase, see get_cpu_time().  peak_rss only ever goes up, it is the
+    highest peak of the process seen at the end of the phase.  Time spent
+    and memory taken in a nested phase only count for the nested phase.
+    Phases run in worker processes are merged in with merge().
+    """
+
+    def __init__(self):
+        self.phases = OrderedDict()
+        self.started = time.time()
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def reset(self):
+        with self.lock:
+            self.phases.clear()
+            self.started = time.time()
+
+    @contextmanager
+    def phase(self, name):
+        stack = self.local.__dict__.setdefault('stack', [])
+        nested = [0.0, 0.0, 0]
+        stack.append(nested)
+        wall, cpu, rss = time.time(), get_cpu_time(), get_rss()
+        try:
+            yield
+        finally:
+            wall, cpu = time.time() - wall, get_cpu_time() - cpu
+            rss = get_rss() - rss
+            stack.pop()
+            if stack:
+                stack[-1][0] += wall
+                stack[-1][1] += cpu
+                stack[-1][2] += rss
+            self.add(name, wall - nested[0], cpu - nested[1], get_peak_rss(),
+                     rss_growth=rss - nested[2])
+
+    def add(self, name, wall, cpu, peak_rss, calls=1, rss_growth=0):
+        # Phases may end in other threads, e.g. prefetching documents.
+        with self.lock:
+            entry = self.phases.setdefault(name, dict(
+                wall=0.0, cpu=0.0, rss_growth=0, peak_rss=0, calls=0))
+            entry['wall'] += wall
+            entry['cpu'] += cpu
+            entry['rss_growth'] += rss_growth
+            entry['peak_rss'] = max(entry['peak_rss'], peak_rss)
+            entry['calls'] += calls
+
+    def merge(self, phases):
+        for name, entry in phases.items():
+            self.add(name, entry['wall'], entry['cpu'], entry['peak_rss'],
+                     entry['calls'], entry['rss_growth'])
+
+    def report(self):
+        """Return the phases as lines of text."""
+        lines = []
+        for name, entry in self.phases.items():
+            lines.append('%-10s %8.2fs wall %8.2fs cpu %+8d MiB rss '
+                         '%8d MiB peak (%d)' % (
+                             name, entry['wall'], entry['cpu'],
+                             entry['rss_growth'] // (1024 * 1024),
+                             entry['peak_rss'] // (1024 * 1024),
+                             entry['calls']))
+        return lines
+
+    def dump(self, filename, **info):
+        """Write the phases, and any extra *info*, to *filename* as JSON."""
+        data = dict(info, started=self.started,
+                    total=time.time() - self.started,
+                    peak_rss=get_peak_rss(), phases=self.phases)
+        with open(filename, 'w') as f:
+            json.dump(data, f, indent=2)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+    sphinxcontrib-docxwatch
+    ~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Rebuild the docx file whenever a source file changes.
+
+    The Sphinx application, and with it the environment and the parsed
+    template, stays in memory between the builds, so a rebuild only costs
+    reading and translating the changed documents.
+
+    :license: BSD, see LICENSE for details.
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import time
+from os import path
+
+from sphinx.application import Sphinx
+
+
+def get_mtimes(srcdir, skip):
+    """Return the modification time of every file below *srcdir*."""
+    mtimes = {}
+    for dirpath, dirnames, filenames in os.walk(srcdir):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.') and
+                       path.join(dirpath, d) not in skip]
+        for filename in filenames:
+            filename = path.join(dirpath, filename)
+            try:
+                mtimes[filename] = path.getmtime(filename)
+            except OSError:
+                pass
+    return mtimes
+
+
+class Watcher(object):
+    """Keep a docx Sphinx application around and rebuild on changes."""
+
+    def __init__(self, srcdir, outdir, doctreedir=None, confoverrides=None,
+                 parallel=0, interval=0.5):
+        self.srcdir = path.abspath(srcdir)
+        self.outdir = path.abspath(outdir)
+        self.doctreedir = path.abspath(
+            doctreedir or path.join(outdir, '.doctrees'))
+        self.confoverrides = confoverrides or {}
+        self.parallel = parallel
+        self.interval = interval
+        self.app = None
+        self.mtimes = {}
+
+    def create_app(self):
+        self.app = Sphinx(self.srcdir, self.srcdir, self.outdir,
+                          self.doctreedir, 'docx', self.confoverrides,
+                          parallel=self.parallel)
+
+    def build(self):
+        start = time.time()
+        if self.app is None:
+            self.create_app()
+        self.app.build()
+        print('docx rebuilt in %.2f seconds' % (time.time() - start))
+
+    def poll(self):
+        """Return the changed files since the last call."""
+        mtimes = get_mtimes(self.srcdir, (self.outdir, self.doctreedir))
+        changed = [filename for filename in set(mtimes) | set(self.mtimes)
+                   if mtimes.get(filename) != self.mtimes.get(filename)]
+        self.mtimes = mtimes
+        return changed
+
+    def try_build(self):
+        """Build, report a failure instead of raising it."""
+        try:
+            self.build()
+        except Exception as exc:
+            print('docx build failed: %s' % exc, file=sys.stderr)
+            # Like docxsphinx.build(), drop the application, the environment
+            # may be half updated.
+            self.app = None
+
+    def rebuild(self):
+        """Rebuild when files changed since the last call, return them."""
+        changed = self.poll()
+        if not changed:
+            return changed
+        if path.join(self.srcdir, 'conf.py') in changed:
+            # A new configuration needs a new application.
+            self.app = None
+        self.try_build()
+        return changed
+
+    def run(self):
+        self.poll()
+        # Keep watching when the first build fails, e.g. on a broken conf.py.
+        self.try_build()
+        while True:
+            time.sleep(self.interval)
+            self.rebuild()
+
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser(
+        description='Rebuild the docx file whenever a source file changes.')
+    parser.add_argument('sourcedir')
+    parser.add_argument('outputdir')
+    parser.add_argument('-d', dest='doctreedir',
+                        help='path for the cached environment and doctree '
+                             'files (default: OUTPUTDIR/.doctrees)')
+    parser.add_argument('-D', dest='define', action='append', default=[],
+                        metavar='setting=value',
+                        help='override a setting in configuration file')
+    parser.add_argument('-j', dest='jobs', type=int, default=0,
+                        help='build in parallel with N processes')
+    parser.add_argument('--interval', type=float, default=0.5,
+                        help='seconds between checks for changed files')
+    args = parser.parse_args(argv)
+
+    confoverrides = {}
+    for define in args.define:
+        key, _, value = define.partition('=')
+        confoverrides[key] = value
+
+    watcher = Watcher(args.sourcedir, args.outputdir, args.doctreedir,
+                      confoverrides, args.jobs, args.interval)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -13,64 +13,121 @@ from __future__ import division
 
 import logging
 import os
-import sys
+from contextlib import contextmanager
+from copy import deepcopy
 
 from docutils import nodes, writers
 from docx import Document
 from docx.enum.style import WD_STYLE_TYPE
-# noinspection PyUnresolvedReferences
-from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_PARAGRAPH_ALIGNMENT
+from docx.image.image import Image
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.oxml import serialize_part_xml
+from docx.opc.pkgwriter import PackageWriter
+from docx.opc.phys_pkg import PhysPkgWriter
 from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
-from docx.shared import Cm, Inches
+from docx.oxml.shape import CT_Inline
+from docx.oxml.table import CT_Tbl
+from docx.shared import Cm, Emu, Inches
 # noinspection PyProtectedMember
-from docx.table import _Cell
-
-logging.basicConfig(
-    filename='docx.log',
-    filemode='w',
-    level=logging.INFO,
-    format="%(asctime)-15s  %(message)s"
-)
-logger = logging.getLogger('docx')
-
-
-def dprint(_func=None, **kw):
-    """Print debug information."""
-    # noinspection PyProtectedMember
-    f = sys._getframe(1)
-    if kw:
-        text = ', '.join('%s = %s' % (k, v) for k, v in kw.items())
-    else:
-        text = dict((k, repr(v)) for k, v in f.f_locals.items() if k != 'self')
-        text = str(text)
-
-    if _func is None:
-        _func = f.f_code.co_name
+from docx.table import Table, _Cell
+from lxml import etree
 
-    if not (_func.startswith("visit") or _func.startswith("depart")) and 'node' in f.f_locals:
-        _func = "?_{}".format(f.f_locals['node'].__class__.__name__)
+from docxsphinx import emitter, snippets
+from docxsphinx.fragment import DocxFragment, renumber_seq_fields
+from docxsphinx.images import get_image_metadata, load_image
+from docxsphinx.styles import StyleResolver
 
-    # It would be nice to have the non-kw dprints to be debug-level' issues,
-    # but that does not seem to work.
-    if kw:
-        logger.info(' '.join([_func, text]))
-
-    logger.info(' '.join([_func, text]))  # HB TODO Remove
-    # print(' '.join([_func, text]))  # HB TODO Remove
+logger = logging.getLogger('docx')
 
 
 # noinspection PyUnusedLocal
 def _make_depart_admonition(name):
     # noinspection PyMissingOrEmptyDocstring,PyUnusedLocal
     def depart_admonition(self, node):
-        dprint()
         raise nodes.SkipNode
         # from sphinx.locale import admonitionlabels, versionlabels, _
 
     return depart_admonition
 
 
+def _iter_rows(tgroup):
+    for part in tgroup.children:
+        if isinstance(part, (nodes.thead, nodes.tbody)):
+            for row in part.children:
+                yield row
+
+
+def _get_entries(row):
+    return [e for e in row.children if isinstance(e, nodes.entry)]
+
+
+def get_row_layouts(tgroup, ncolumns):
+    """
+    Return the cells of each row of *tgroup*, from the morecols and morerows
+    of the entries, as lists of (columns spanned, w:vMerge value or None).
+
+    A cell that continues a cell of the row above has no entry of its own.
+    Rows with fewer entries than *ncolumns* are filled up with cells.
+    """
+    layouts = []
+    # (rows left, columns spanned) of the row spans, at their first column.
+    spanning = [None] * ncolumns
+    for row in _iter_rows(tgroup):
+        entries = iter(_get_entries(row))
+        layout = []
+        column = 0
+        while column < ncolumns:
+            if spanning[column] is not None:
+                rows, span = spanning[column]
+                spanning[column] = (rows - 1, span) if rows > 1 else None
+                layout.append((span, 'continue'))
+                column += span
+                continue
+            entry = next(entries, None)
+            if entry is None:
+                layout.append((1, None))
+                column += 1
+                continue
+            span = entry.get('morecols', 0) + 1
+            if entry.get('morerows'):
+                spanning[column] = (entry['morerows'], span)
+                layout.append((span, 'restart'))
+            else:
+                layout.append((span, None))
+            column += span
+        layouts.append(layout)
+    return layouts
+
+
+def get_content_widths(tgroup, layouts, ncolumns):
+    """
+    Return the width of the content of each column of *tgroup* in characters,
+    for the row *layouts* of get_row_layouts().
+
+    That is the average length of the text of its cells, or the length of
+    its longest word if that is more, so the words still fit.  The text of
+    a cell spanning columns is shared by them.
+    """
+    lengths = [0] * ncolumns
+    cells = [0] * ncolumns
+    words = [1] * ncolumns
+    for row, layout in zip(_iter_rows(tgroup), layouts):
+        entries = iter(_get_entries(row))
+        column = 0
+        for span, merge in layout:
+            entry = None if merge == 'continue' else next(entries, None)
+            if entry is not None:
+                text = entry.astext()
+                longest = max([len(word) for word in text.split()] or [0])
+                for spanned in range(column, column + span):
+                    lengths[spanned] += len(text) / span
+                    cells[spanned] += 1
+                    words[spanned] = max(words[spanned], longest / span)
+            column += span
+    return [max(words[column], lengths[column] / (cells[column] or 1))
+            for column in range(ncolumns)]
+
+
 # noinspection PyClassicStyleClass,PyMissingOrEmptyDocstring
 class DocxWriter(writers.Writer):
     """docutil writer class for docx files"""
@@ -81,6 +138,11 @@ class DocxWriter(writers.Writer):
     output = None
     template_dir = "NO"
 
+    code_font = 'Courier New'
+    "Font of inline literals."
+    link_style = 'Hyperlink'
+    "Character style of references, if the template has it."
+
     def __init__(self, builder):
         writers.Writer.__init__(self)
         self.builder = builder
@@ -89,8 +151,54 @@ class DocxWriter(writers.Writer):
         if self.template_dir == "NO":
             dc = Document()
         else:
-            dc = Document(os.path.join('source', self.template_dir))
+            dc = Document(self.template_path)
         self.docx_container = dc
+        self.template_body = [deepcopy(e) for e in dc.element.body]
+        "Copy of the template body, see reset()."
+        self.template_rels = set(dc.part.rels)
+        self.styles = StyleResolver(dc.styles)
+        self.paragraph_properties = {}
+        "w:pPr prototypes, see get_paragraph_properties()."
+        self.run_properties = {}
+        "w:rPr prototypes, see get_run_properties()."
+        self.template_image_parts = dict(
+            (p.sha1, p) for p in dc.part.package.image_parts)
+        self.image_parts = dict(self.template_image_parts)
+        "Image parts in the container, keyed by the SHA1 of the image."
+        self.image_sha1s = dict(
+            (p.partname, sha1) for sha1, p in self.image_parts.items())
+        "SHA1 of the image of each image part, keyed by part name."
+
+        self.seq_counters = {}
+        "Last number used for each SEQ field sequence in the spliced fragments."
+        self.next_shape_id = None
+        "Id for the next spliced drawing, ids must be unique in the document."
+        self.stream = None
+        "BodyStream the spliced elements go to, see streaming()."
+
+    def reset(self):
+        """
+        Restore the container to the template after a save, so the writer can
+        be used for another build without parsing the template again.
+        """
+        body = self.docx_container.element.body
+        for element in list(body):
+            emitter.remove_block(body, element)
+        for element in self.template_body:
+            body.append(deepcopy(element))
+        rels = self.docx_container.part.rels
+        for rid in list(rels):
+            if rid not in self.template_rels:
+                del rels[rid]
+        image_parts = self.docx_container.part.package.image_parts
+        # noinspection PyProtectedMember
+        image_parts._image_parts[:] = self.template_image_parts.values()
+        self.image_parts = dict(self.template_image_parts)
+        self.image_sha1s = dict(
+            (p.partname, sha1) for sha1, p in self.image_parts.items())
+        self.seq_counters = {}
+        self.next_shape_id = None
+        self.styles.reset()
 
     def template_setup(self):
         dotx = self.builder.config['docx_template']
@@ -98,15 +206,271 @@ class DocxWriter(writers.Writer):
             logger.info("MK using template {}".format(dotx))
             self.template_dir = dotx
 
+    @property
+    def template_path(self):
+        return os.path.join(self.builder.confdir, self.template_dir)
+
     def save(self, filename):
         self.docx_container.save(filename)
 
+    @contextmanager
+    def streaming(self, filename):
+        """
+        Save the container to *filename*, like save() does, with the elements
+        spliced by assemble() in the with block written straight to
+        word/document.xml instead of added to the container.
+
+        The other parts are written at the end of the block, when the images
+        and their relationships are known.  *filename* is removed when the
+        block fails.
+        """
+        part = self.docx_container.part
+        package = part.package
+        phys_writer = PhysPkgWriter(filename)
+        try:
+            # noinspection PyProtectedMember
+            with phys_writer._zipf.open(part.partname.membername, 'w') as f:
+                self.stream = BodyStream(self.docx_container.element, f)
+                try:
+                    yield
+                    self.stream.close()
+                finally:
+                    self.stream = None
+            parts = package.parts
+            for other in parts:
+                other.before_marshal()
+            # noinspection PyProtectedMember
+            PackageWriter._write_content_types_stream(phys_writer, parts)
+            # noinspection PyProtectedMember
+            PackageWriter._write_pkg_rels(phys_writer, package.rels)
+            for other in parts:
+                if other is not part:
+                    phys_writer.write(other.partname, other.blob)
+                if len(other.rels):
+                    phys_writer.write(other.partname.rels_uri,
+                                      other.rels.xml)
+        except BaseException:
+            phys_writer.close()
+            os.remove(filename)
+            raise
+        phys_writer.close()
+
+    def get_paragraph_properties(self, style=None, alignment=None,
+                                 left_indent=None):
+        """
+        Return the w:pPr prototype for paragraphs with the paragraph style
+        *style*, *alignment* and *left_indent*.  A missing style is warned
+        about and left out.
+        """
+        style_id = self.styles.get_style_id(style, WD_STYLE_TYPE.PARAGRAPH)
+        key = (style_id, alignment, left_indent)
+        if key not in self.paragraph_properties:
+            self.paragraph_properties[key] = \
+                emitter.make_paragraph_properties(
+                    self.docx_container.element, style_id, alignment,
+                    left_indent)
+        return self.paragraph_properties[key]
+
+    def get_run_properties(self, formatting):
+        """
+        Return the w:rPr prototype for runs with the character *formatting*,
+        a frozenset of 'bold', 'italic', 'code', 'link', 'subscript' and
+        'superscript', or None for plain text.
+        """
+        if formatting not in self.run_properties:
+            style_id = None
+            if 'link' in formatting:
+                # References are not styled at all without the style.
+                style_id = self.styles.lookup(self.link_style,
+                                              WD_STYLE_TYPE.CHARACTER) or None
+            vert_align = None
+            if 'superscript' in formatting:
+                vert_align = 'superscript'
+            elif 'subscript' in formatting:
+                vert_align = 'subscript'
+            self.run_properties[formatting] = emitter.make_run_properties(
+                self.docx_container.element, style_id,
+                self.code_font if 'code' in formatting else None,
+                'bold' in formatting, 'italic' in formatting, vert_align)
+        return self.run_properties[formatting]
+
+    def get_or_add_image_part(self, sha1, load_image):
+        """
+        Return the image part of the image with SHA1 *sha1*, adding the image
+        returned by *load_image* when the container has no such part yet.
+
+        Unlike python-docx, this neither hashes the new image nor all the
+        images already in the container.
+        """
+        image_part = self.image_parts.get(sha1)
+        if image_part is None:
+            image_parts = self.docx_container.part.package.image_parts
+            # noinspection PyProtectedMember
+            image_part = image_parts._add_image_part(load_image())
+            self.image_parts[sha1] = image_part
+            self.image_sha1s[image_part.partname] = sha1
+        return image_part
+
+    def add_picture(self, r, filename, metadata=None, width=None,
+                    height=None):
+        """
+        Add the image *filename* to the run *r*, like Run.add_picture does.
+
+        With the *metadata* collected while reading, see docxsphinx.images,
+        the image file is only read when it is not in the container yet, and
+        never parsed.
+        """
+        if metadata is None:
+            image = Image.from_file(filename)
+            image_part = self.get_or_add_image_part(image.sha1, lambda: image)
+        else:
+            image_part = self.get_or_add_image_part(
+                metadata['sha1'], lambda: load_image(filename, metadata))
+        part = self.docx_container.part
+        rid = part.relate_to(image_part, RT.IMAGE)
+        image = image_part.image
+        cx, cy = image.scaled_dimensions(width, height)
+        inline = CT_Inline.new_pic_inline(
+            part.next_id, rid, image.filename, cx, cy)
+        r.add_drawing(inline)
+
+    def get_translator(self, document):
+        if self.builder.config.docx_trace:
+            return DocxTracingTranslator(document, self.builder, self)
+        return DocxTranslator(document, self.builder, self)
+
     def translate(self):
-        visitor = DocxTranslator(
-            self.document, self.builder, self.docx_container)
-        self.document.walkabout(visitor)
+        visitor = self.get_translator(self.document)
+        visitor.walkabout(self.document)
         self.output = ''  # visitor.body
 
+    def translate_fragment(self, docname, doctree):
+        """
+        Translate a single document into a DocxFragment.
+
+        The document is translated into the container, like translate() does,
+        and the resulting body elements are detached again.
+        """
+        body = self.docx_container.element.body
+        start = emitter.get_last_block(body)
+        visitor = self.get_translator(doctree)
+        visitor.walkabout(doctree)
+
+        elements = list(emitter.iter_blocks_after(body, start))
+        for element in elements:
+            emitter.remove_block(body, element)
+
+        related_parts = self.docx_container.part.related_parts
+        images = {}
+        for element in elements:
+            for rid in element.xpath('.//a:blip/@r:embed'):
+                image_part = related_parts[rid]
+                images[rid] = (self.image_sha1s[image_part.partname],
+                               image_part.blob)
+
+        positions = dict((e, i + 1) for i, e in enumerate(elements))
+        positions[start] = 0
+        toctrees = [(positions[last], includefiles)
+                    for last, includefiles in visitor.toctrees]
+        return DocxFragment(docname, elements, images, toctrees,
+                            visitor.runs_saved)
+
+    def assemble(self, docname, fragments, traversed=None, copy=False):
+        """
+        Splice the fragment of *docname* into the container, and recursively
+        the fragments of all documents in its toctrees, in toctree order.
+
+        The elements of the fragments are moved, so every fragment can only
+        be spliced once, unless *copy* is set.
+        """
+        if traversed is None:
+            traversed = [docname]
+        fragment = fragments[docname]
+        part = self.docx_container.part
+        body = self.docx_container.element.body
+        if self.next_shape_id is None:
+            self.next_shape_id = part.next_id
+
+        rids = {}
+        for rid, (sha1, blob) in fragment.images.items():
+            image_part = self.get_or_add_image_part(
+                sha1, lambda: Image.from_blob(blob))
+            rids[rid] = part.relate_to(image_part, RT.IMAGE)
+
+        toctrees = list(fragment.toctrees)
+        for position, element in enumerate(fragment.elements):
+            while toctrees and toctrees[0][0] <= position:
+                self._assemble_toctree(toctrees.pop(0)[1], fragments,
+                                       traversed, copy)
+            if position == 0 and len(traversed) > 1 and \
+                    element.tag == qn('w:p') and not len(element.r_lst):
+                # Skip the paragraph that every translation starts with,
+                # included documents continue the including one.
+                continue
+            if copy:
+                element = deepcopy(element)
+            for blip in element.xpath('.//a:blip'):
+                blip.set(qn('r:embed'), rids[blip.get(qn('r:embed'))])
+            for docpr in element.xpath('.//wp:docPr'):
+                docpr.set('id', str(self.next_shape_id))
+                docpr.set('name', 'Picture {}'.format(self.next_shape_id))
+                self.next_shape_id += 1
+            renumber_seq_fields(element, self.seq_counters)
+            if self.stream is not None:
+                self.stream.write(element)
+            else:
+                emitter.add_block(body, element)
+        for position, includefiles in toctrees:
+            self._assemble_toctree(includefiles, fragments, traversed, copy)
+
+    def _assemble_toctree(self, includefiles, fragments, traversed, copy):
+        for includefile in includefiles:
+            if includefile in traversed:
+                continue
+            traversed.append(includefile)
+            if includefile not in fragments:
+                logger.warning('toctree contains ref to nonexisting file '
+                               '{}'.format(includefile))
+                continue
+            self.assemble(includefile, fragments, traversed, copy)
+
+
+class BodyStream(object):
+    """
+    word/document.xml written to the file *f* one body element at a time.
+
+    The document element is serialized once, with the template contents of
+    the body, and the elements written go in before the section properties
+    of the body.  They are serialized in a scratch document with the same
+    namespaces, so they come out as they would in the document itself.
+    """
+
+    marker = 'docxsphinx-body'
+
+    def __init__(self, document, f):
+        self.f = f
+        body = document.body
+        marker = etree.Comment(self.marker)
+        emitter.add_block(body, marker)
+        try:
+            xml = serialize_part_xml(document)
+        finally:
+            body.remove(marker)
+        self.head, self.tail = xml.split(etree.tostring(marker), 1)
+        root = document.makeelement(document.tag, nsmap=document.nsmap)
+        self.scratch = etree.SubElement(root, body.tag)
+        self.f.write(self.head)
+
+    def write(self, element):
+        self.scratch.append(element)
+        xml = etree.tostring(self.scratch, encoding='UTF-8',
+                             xml_declaration=False)
+        emitter.remove_block(self.scratch, element)
+        self.f.write(xml[xml.index(b'>') + 1:xml.rindex(b'</')])
+
+    def close(self):
+        self.f.write(self.tail)
+
 
 class DocxState(object):
     """
@@ -120,9 +484,20 @@ class DocxState(object):
         self.table = None
         self.column_widths = None
         self.table_style = None
-        self.more_cols = 0
-        self.row = None
+        self.row_layouts = None
+        "Cells of each row of the current tgroup, see get_row_layouts()."
+        self.row_counter = 0
+        self.grid_widths = None
+        "Widths of the grid columns of the current table, for new rows."
+        self.row_prototypes = None
+        "Rows to copy for new rows, by the layout of their cells."
+        self.cells = None
+        "Cells of the current row, one for each entry."
         self.cell_counter = 0
+        self.paragraphs = 0
+        "Number of paragraphs in the location, if it is a table cell."
+        self.first_paragraph = None
+        "The paragraph the table cell was created with."
         self.next_figure_num = 1
         "Next figure number to assign"
         self.ncolumns = 1
@@ -133,9 +508,11 @@ class DocxState(object):
 class DocxTranslator(nodes.NodeVisitor):
     """Visitor class to create docx content."""
 
-    def __init__(self, document, builder, docx_container):
+    def __init__(self, document, builder, writer):
         self.builder = builder
-        self.docx_container = docx_container
+        self.writer = writer
+        self.docx_container = writer.docx_container
+        self.body = writer.docx_container.element.body
         nodes.NodeVisitor.__init__(self, document)
 
         # TODO: Perhaps move the list_style into DocxState.
@@ -152,9 +529,19 @@ class DocxTranslator(nodes.NodeVisitor):
         self.table_style_default = 'Medium Grid 1 Accent 1'
         self.in_literal_block = False
         self.in_figure = False
-        self.strong = False
-        self.emphasis = False
+        self.toctrees = []
+        "Last body element and included documents of each toctree visited."
+        self.formatting = [(frozenset(), None)]
+        "Stack of (character formatting, w:rPr) of the inline markup visited."
         self.center = False
+        self.block_width = None
+        "Width of the text on the page in EMU, for the widths of columns."
+        self.pending_text = []
+        "Text not added to the current paragraph yet, see add_text()."
+        self.pending_properties = None
+        "w:rPr prototype of the pending text."
+        self.runs_saved = 0
+        "Number of runs saved by joining text with the same formatting."
 
         self.current_state = DocxState(location=self.docx_container)
         self.current_state.table_style = self.table_style_default
@@ -163,78 +550,169 @@ class DocxTranslator(nodes.NodeVisitor):
         self.old_states = []
         "A list of older states, e.g. typically [document, table-cell]"
 
-        self.current_paragraph = self.current_state.location.add_paragraph("")
-        "The current paragraph that text is being added to."
+        self.current_style = None
+        "Name of the style of the current paragraph, if it is a list item."
+        self.current_paragraph = emitter.add_paragraph(self.body)
 
-    def add_text(self, text):
-        dprint()
-        textrun = self.current_paragraph.add_run(text)
-        if self.strong:
-            textrun.bold = True
-        if self.emphasis:
-            textrun.italic = True
-
-    def add_paragraph(self, dest, text='', style=None):
-        p = dest.add_paragraph(text, style)
+    @property
+    def current_paragraph(self):
+        "The current paragraph (w:p element) that text is being added to."
+        return self._current_paragraph
 
-        if self.center:
-            p.paragraph_format.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+    @current_paragraph.setter
+    def current_paragraph(self, paragraph):
+        if self.pending_text:
+            self.flush_text()
+        self._current_paragraph = paragraph
+        self.current_style = None
 
+    def add_text(self, text):
+        """
+        Add *text* to the current paragraph.
+
+        Adjacent text with the same run properties goes into a single run,
+        so the text is kept until the properties or the paragraph change, or
+        flush_text() is called.  Empty text gets no run at all.
+        """
+        if not text:
+            return
+        properties = self.formatting[-1][1]
+        if self.pending_text:
+            if properties is self.pending_properties:
+                self.runs_saved += 1
+            else:
+                self.flush_text()
+        self.pending_text.append(text)
+        self.pending_properties = properties
+
+    def flush_text(self):
+        """Add the pending text to the current paragraph, as a single run."""
+        if not self.pending_text:
+            return
+        emitter.add_run(self._current_paragraph, ''.join(self.pending_text),
+                        self.pending_properties)
+        self.pending_text = []
+
+    def push_formatting(self, *names):
+        """
+        Add the character formatting *names* for the text up to the next
+        pop_formatting(), see DocxWriter.get_run_properties().
+        """
+        formatting = self.formatting[-1][0].union(names)
+        self.formatting.append(
+            (formatting, self.writer.get_run_properties(formatting)))
+
+    def pop_formatting(self, node=None):
+        """Remove the formatting pushed last, departing *node*."""
+        self.formatting.pop()
+
+    def get_block_parent(self, location):
+        """Return the element that paragraphs added to *location* go in."""
+        if isinstance(location, _Cell):
+            return location._tc
+        return self.body
+
+    def add_paragraph(self, dest, text='', style=None, alignment=None,
+                      left_indent=None):
+        if self.center and alignment is None:
+            alignment = 'center'
+        pPr = None
+        if style is not None or alignment is not None or \
+                left_indent is not None:
+            pPr = self.writer.get_paragraph_properties(style, alignment,
+                                                       left_indent)
+        p = emitter.add_paragraph(self.get_block_parent(dest), pPr)
+        self.current_state.paragraphs += 1
+        if text:
+            emitter.add_run(p, text)
         return p
 
-    def add_seq_field(self, field_type, contents):
-        paragraph = self.current_paragraph
-        run = paragraph.add_run()
-        r = run._r
-
-        fldChar = OxmlElement('w:fldChar')
-        fldChar.set(qn('w:fldCharType'), 'begin')
-        r.append(fldChar)
-
-        run = paragraph.add_run()
-        r = run._r
-
-        instrText = OxmlElement('w:instrText')
-        instrText.set(qn('xml:space'), 'preserve')
-        logger.info(' SEQ {} \* ARABIC'.format(field_type))
-        instrText.text = ' SEQ {} \* ARABIC '.format(field_type)
-        r.append(instrText)
-
-        run = paragraph.add_run()
-        r = run._r
-
-        fldChar = OxmlElement('w:fldChar')
-        fldChar.set(qn('w:fldCharType'), 'separate')
-        r.append(fldChar)
-
-        paragraph.add_run(str(contents))
-
-        run = paragraph.add_run()
-        r = run._r
-
-        fldChar = OxmlElement('w:fldChar')
-        fldChar.set(qn('w:fldCharType'), 'end')
-        r.append(fldChar)
+    def set_style(self, paragraph, style):
+        """Set the style of *paragraph* to the paragraph style *style*."""
+        emitter.set_style(paragraph, self.writer.styles.get_style_id(
+            style, WD_STYLE_TYPE.PARAGRAPH))
 
     def new_state(self, location):
-        dprint()
         self.old_states.append(self.current_state)
         self.current_state = DocxState(location=location)
 
     def end_state(self, first=None):
-        dprint()
         self.current_state = self.old_states.pop()
 
     def print_and_skip(self, node):
-        dprint()
         raise nodes.SkipNode
 
     def just_print(self, node):
-        dprint()
         pass
 
+    @classmethod
+    def get_handlers(cls, node_class):
+        """
+        Return the (visit, depart) functions for nodes of *node_class*.
+
+        The handlers of the nearest base class that has any are used, or
+        unknown_visit and unknown_departure.  Handlers that do nothing are
+        None, a visit handler that skips the node is SKIP_NODE.  The result
+        is kept in the dispatch table of the class.
+        """
+        table = cls.__dict__.get('dispatch_table')
+        if table is None:
+            table = cls.dispatch_table = {}
+        if node_class in table:
+            return table[node_class]
+        visit = depart = None
+        for base in node_class.__mro__:
+            visit = getattr(cls, 'visit_' + base.__name__, None)
+            depart = getattr(cls, 'depart_' + base.__name__, None)
+            if visit is not None or depart is not None:
+                break
+        handlers = []
+        for handler in (visit or cls.unknown_visit,
+                        depart or cls.unknown_departure):
+            handler = getattr(handler, '__func__', handler)
+            if handler is _just_print:
+                handler = None
+            elif handler is _print_and_skip:
+                handler = SKIP_NODE
+            handlers.append(handler)
+        table[node_class] = tuple(handlers)
+        return table[node_class]
+
+    def walkabout(self, node):
+        """
+        Translate *node*, like node.walkabout(self) but dispatching through
+        the dispatch table, see get_handlers().
+        """
+        visit, depart = self.get_handlers(node.__class__)
+        if visit is SKIP_NODE:
+            return False
+        if depart is SKIP_NODE:
+            depart = _print_and_skip
+        stop = False
+        try:
+            try:
+                if visit is not None:
+                    visit(self, node)
+            except nodes.SkipNode:
+                return stop
+            except nodes.SkipDeparture:
+                depart = None
+            try:
+                for child in node.children[:]:
+                    if self.walkabout(child):
+                        stop = True
+                        break
+            except nodes.SkipSiblings:
+                pass
+        except nodes.SkipChildren:
+            pass
+        except nodes.StopTraversal:
+            stop = True
+        if depart is not None:
+            depart(self, node)
+        return stop
+
     def visit_start_of_file(self, node):
-        dprint()
         # TODO: HB should visit_start_of_file reset the sectionlevel?
         # If so, should it start a new state? If so, with which location?
 
@@ -245,8 +723,14 @@ class DocxTranslator(nodes.NodeVisitor):
         # (BTW Sphinx has heading levels per file? or entire document?)
         self.sectionlevel = 0
 
+    def visit_toctree(self, node):
+        # Toctrees are only left in the doctree when documents are translated
+        # one at a time, remember where the included documents go.
+        self.toctrees.append((emitter.get_last_block(self.body),
+                              list(node['includefiles'])))
+        raise nodes.SkipNode
+
     def visit_comment(self, node):
-        dprint()
         # TODO: FIX Dirty hack / kludge to set table style.
         # Use proper directives or something like that
         comment = node[0]
@@ -256,64 +740,48 @@ class DocxTranslator(nodes.NodeVisitor):
         raise nodes.SkipNode
 
     def visit_section(self, node):
-        dprint()
         self.sectionlevel += 1
 
     def depart_section(self, node):
-        dprint()
         if self.sectionlevel > 0:
             self.sectionlevel -= 1
 
     def visit_strong(self, node):
-        dprint()
-        # self.add_text('**')
-        self.strong = True
+        self.push_formatting('bold')
 
-    def depart_strong(self, node):
-        dprint()
-        # self.add_text('**')
-        self.strong = False
+    depart_strong = pop_formatting
 
     def visit_emphasis(self, node):
-        dprint()
-        # self.add_text('*')
-        self.emphasis = True
+        self.push_formatting('italic')
 
-    def depart_emphasis(self, node):
-        dprint()
-        # self.add_text('*')
-        self.emphasis = False
+    depart_emphasis = pop_formatting
 
     def visit_title(self, node):
-        dprint()
-        self.current_paragraph = self.current_state.location.add_heading(
-            level=self.sectionlevel)
+        if self.sectionlevel == 0:
+            style = 'Title'
+        else:
+            style = 'Heading {}'.format(self.sectionlevel)
+        self.current_paragraph = emitter.add_paragraph(
+            self.get_block_parent(self.current_state.location),
+            self.writer.get_paragraph_properties(style))
+        self.current_state.paragraphs += 1
 
     depart_title = just_print
 
     def visit_figure(self, node):
         # FIXME: figure text become normal paragraph instead of caption.
-        dprint()
-
-        logger.info('ATTRIBUTES:FIGURE:{}'.format(node.attributes))
         self.in_figure = True
-        curloc = self.current_state.location
-        logger.info('CURRENT_LOC:FIGURE:{}'.format(repr(curloc)))
 
         if 'align' in node.attributes:
             if node.attributes['align'] == 'center':
                 self.center = True
 
     def depart_figure(self, node):
-        dprint()
         self.in_figure = False
         if 'align' in node.attributes and 'center' == node.attributes['align']:
             self.center = False
 
     def visit_caption(self, node):
-        dprint()
-
-        logger.info('ATTRIBUTES:FIGURE:{}'.format(repr(node.attlist())))
         curloc = self.current_state.location
 
         contents = None
@@ -321,122 +789,142 @@ class DocxTranslator(nodes.NodeVisitor):
             contents = self.current_state.next_figure_num
             self.current_state.next_figure_num += 1
 
-        self.current_paragraph = self.add_paragraph(curloc, 'Figure ', style='Caption')
-        self.add_seq_field('Figure', contents)
-        self.current_paragraph.add_run(': ')
+        self.current_paragraph = self.add_paragraph(curloc, style='Caption')
+        snippets.CAPTION.append_to(
+            self.current_paragraph, label='Figure ',
+            instruction=snippets.seq_instruction('Figure'), result=contents,
+            separator=': ')
 
     def depart_caption(self, node):
         self.current_paragraph = self.add_paragraph(self.current_state.location)
 
     def visit_tabular_col_spec(self, node):
-        dprint()
         # TODO: properly implement this!!
         spec = node['spec']
         widths = [float(l.split('cm')[0]) for l in spec.split("{")[1:]]
         self.current_state.column_widths = widths
         raise nodes.SkipNode
 
-    def visit_colspec(self, node):
-        dprint()
-        # The difficulty here is getting the right column width.
-        # This can be specified with a tabular_col_spec, see above.
-        #
-        # Otherwise it is derived from the number of columns, which is
-        # defined in visit_tgroup (a bit hackish).
-        # The _block_width is the full width of the document, and this
-        # is divided by the number of columns.
-        #
-        # It would perhaps also be possible to use node['colwidth'] in some way.
-        # node['colwidth'] contains an integer like 22, the width of the column in ascii
-        if self.current_state.column_widths:
-            width = self.current_state.column_widths[0]
-            self.current_state.column_widths = self.current_state.column_widths[1:]
-            col = self.current_state.table.add_column(Cm(width))
-        else:
+    def get_column_widths(self, colspecs, weights=None):
+        """
+        Return the widths of the columns of *colspecs*, in twips as strings.
+
+        The widths in cm of a tabular_col_spec before the table go first.
+        The other columns share the width of the page in proportion to their
+        *weights*, by default their colwidth, the width in characters in the
+        source.
+        """
+        if self.block_width is None:
+            # This searches the document for its sections.
             # noinspection PyProtectedMember
-            col = self.current_state.table.add_column(
-                self.docx_container._block_width // self.current_state.ncolumns)
-
-        raise nodes.SkipNode
+            self.block_width = self.docx_container._block_width
+        if weights is None:
+            weights = [colspec.get('colwidth') or 1 for colspec in colspecs]
+        widths = []
+        for weight in weights:
+            if self.current_state.column_widths:
+                width = Cm(self.current_state.column_widths[0])
+                self.current_state.column_widths = \
+                    self.current_state.column_widths[1:]
+            else:
+                width = Emu(int(self.block_width * weight // sum(weights)))
+            widths.append(str(width.twips))
+        return widths
 
+    # The columns are added in visit_tgroup, all at once.
+    visit_colspec = print_and_skip
     depart_colspec = just_print
 
     def visit_tgroup(self, node):
-        dprint()
         colspecs = [c for c in node.children if isinstance(c, nodes.colspec)]
-        self.current_state.ncolumns = len(colspecs)
+        state = self.current_state
+        state.ncolumns = len(colspecs)
+        # Spans are laid out for all rows at once, as a row spanning cell
+        # leaves a cell without an entry in the rows below.
+        state.row_layouts = get_row_layouts(node, len(colspecs))
+        state.row_counter = 0
+        tbl = state.table._tbl
+        if self.builder.config.docx_table_layout == 'fixed':
+            # Word does not fit the columns to their content when the
+            # document is opened, so do it here.
+            state.grid_widths = self.get_column_widths(
+                colspecs,
+                get_content_widths(node, state.row_layouts, len(colspecs)))
+            emitter.set_fixed_layout(
+                tbl, str(sum(int(w) for w in state.grid_widths)))
+        else:
+            state.grid_widths = self.get_column_widths(colspecs)
+        emitter.add_grid_columns(tbl, state.grid_widths)
+        state.row_prototypes = {}
 
     def depart_tgroup(self, node):
-        dprint()
         self.current_state.ncolumns = 1
-        pass
+        self.current_state.row_layouts = None
+        self.current_state.row_prototypes = None
 
     def visit_row(self, node):
-        dprint()
-        self.current_state.row = self.current_state.table.add_row()
-        self.current_state.cell_counter = 0
+        state = self.current_state
+        tbl = state.table._tbl
+        layout = tuple(state.row_layouts[state.row_counter])
+        state.row_counter += 1
+        prototype = state.row_prototypes.get(layout)
+        if prototype is None:
+            prototype = state.row_prototypes[layout] = emitter.make_row(
+                tbl, state.grid_widths, [span for span, merge in layout],
+                [merge for span, merge in layout])
+        tr = emitter.copy_row(tbl, prototype)
+        # Row.cells makes the list of cells anew every time, from the XML.
+        state.cells = [_Cell(tc, state.table)
+                       for tc, (span, merge) in zip(tr, layout)
+                       if merge != 'continue']
+        state.cell_counter = 0
 
     depart_row = just_print
 
     def visit_entry(self, node):
-        dprint()
-        if 'morerows' in node:
-            raise NotImplementedError('Row spanning cells are not implemented.')
-        if 'morecols' in node:
-            # Hack to make column spanning possible. TODO FIX
-            self.current_state.more_cols = node['morecols']
-
-        cell = self.current_state.row.cells[self.current_state.cell_counter]
+        # Cells spanning columns and rows are made that way in visit_row.
+        cell = self.current_state.cells[self.current_state.cell_counter]
         # A new paragraph will be added by Sphinx, so remove the automated one
         # This turns out to be not possible, so instead the existing one is
         # reused in visit_paragraph.
         # cell.paragraphs.pop()
-        if self.current_state.more_cols:
-            # Perhaps this commented line works no too.
-            # cell = cell.merge(self.row.cells[self.cell_counter + self.more_cols])
-            for i in range(self.current_state.more_cols):
-                cell = cell.merge(self.current_state.row.cells[
-                                      self.current_state.cell_counter + i + 1])
 
         self.new_state(location=cell)
         # For some annoying reason, a new paragraph is automatically added
         # to each table cell. This is frustrating when you want, e.g. to
         # add a list item instead of a normal paragraph.
-        self.current_paragraph = cell.paragraphs[0]
+        self.current_paragraph = cell._tc.find(emitter.W_P)
+        self.current_state.first_paragraph = self.current_paragraph
+        self.current_state.paragraphs = 1
 
     def depart_entry(self, node):
-        dprint()
         self.end_state()
-        self.current_state.cell_counter = self.current_state.cell_counter + self.current_state.more_cols + 1
-        self.current_state.more_cols = 0
+        self.current_state.cell_counter += 1
 
     def visit_table(self, node):
-        dprint()
-
         style = self.current_state.table_style
-        try:
-            # Check whether the style is part of the document.
-            self.docx_container.styles.get_style_id(style, WD_STYLE_TYPE.TABLE)
-        except KeyError as exc:
-            msg = 'looks like style "{}" is missing\n{}\n using no style'.format(
-                style, repr(exc))
-            logger.warning(msg)
+        if self.writer.styles.is_missing(style, WD_STYLE_TYPE.TABLE):
             style = None
 
-        # Columns are added when a colspec is visited.
+        # Columns are added when the tgroup is visited.
 
         # It is only possible to use a style in add_table when adding a
         # table to the root document. That is, not for a table in a table.
-        if len(self.old_states):
-            self.current_state.table = self.current_state.location.add_table(rows=0,
-                                                                             cols=0)
+        location = self.current_state.location
+        if isinstance(location, _Cell):
+            # This adds a paragraph after the table too.
+            self.current_state.table = location.add_table(rows=0, cols=0)
+            self.current_state.paragraphs += 1
         else:
-            self.current_state.table = self.current_state.location.add_table(
-                rows=0, cols=0, style=style)
+            # Like Document.add_table, without searching the body.
+            tbl = emitter.add_block(self.body, CT_Tbl.new_tbl(0, 0, 0))
+            # noinspection PyProtectedMember
+            self.current_state.table = Table(tbl, location._body)
+        if not len(self.old_states):
+            self.current_state.table._tbl.tblStyle_val = \
+                self.writer.styles.get_style_id(style, WD_STYLE_TYPE.TABLE)
 
     def depart_table(self, node):
-        dprint()
-
         self.current_state.table = None
         self.current_state.table_style = self.table_style_default
 
@@ -445,7 +933,6 @@ class DocxTranslator(nodes.NodeVisitor):
         self.add_paragraph(self.current_state.location, "")
 
     def visit_Text(self, node):
-        dprint()
         text = node.astext()
         if not self.in_literal_block:
             # assert '\n\n' not in text, 'Found \n\n'
@@ -459,14 +946,15 @@ class DocxTranslator(nodes.NodeVisitor):
     depart_Text = just_print
 
     def visit_image(self, node):
-        dprint()
-        logger.info('ATTRIBUTES:FIGURE:{}'.format(repr(node.attributes)))
         uri = node.attributes['uri']
         file_path = os.path.join(self.builder.env.srcdir, uri)
-        dest = self.docx_container
+        metadata = get_image_metadata(
+            self.builder.env, self.document.get('docname'), uri)
         if self.in_figure:
             self.current_paragraph = self.add_paragraph(self.current_state.location)
-            dest = self.current_paragraph.add_run()
+            dest = emitter.add_run(self.current_paragraph)
+        else:
+            dest = emitter.add_run(emitter.add_paragraph(self.body))
 
         width = None
         height = None
@@ -477,14 +965,13 @@ class DocxTranslator(nodes.NodeVisitor):
         if 'width' in node.attributes:
             width = Inches(float(node.attributes['width'][0:-2]))
 
-        logger.info("width: {}, height: {}".format(width, height))
-        dest.add_picture(file_path, height=height, width=width)
+        self.writer.add_picture(dest, file_path, metadata,
+                                width=width, height=height)
         # .. todo:: 'width' keyword is not supported
 
     depart_image = just_print
 
     def visit_bullet_list(self, node):
-        dprint()
         # TODO: Apparently it is necessary to take into account whether
         # the list is numbered or not, like the original code did.
         # But that code did not properly account for the level.
@@ -493,110 +980,96 @@ class DocxTranslator(nodes.NodeVisitor):
         self.list_level += 1
 
     def depart_bullet_list(self, node):
-        dprint()
         # TODO: self.list_style.pop()
         self.list_level -= 1
 
     def visit_enumerated_list(self, node):
-        dprint()
         # TODO: self.list_style.append('ListNumber')
         self.list_level += 1
 
     def depart_enumerated_list(self, node):
-        dprint()
         # TODO: self.list_style.pop()
         self.list_level -= 1
 
     def visit_list_item(self, node):
-        dprint()
+        self.flush_text()
         # A new paragraph is created here, but the next visit is to
         # paragraph, so that would add another paragraph. That is
         # prevented if current_paragraph is an empty List paragraph.
         style = 'List Bullet' if self.list_level < 2 else 'List Bullet {}'.format(
             self.list_level)
-        try:
-            # Check whether the style is part of the document.
-            self.docx_container.styles.get_style_id(style, WD_STYLE_TYPE.PARAGRAPH)
-        except KeyError as exc:
-            msg = 'looks like style "{}" is missing\n{}\n using no style'.format(
-                style, repr(exc))
-            logger.warning(msg)
+        if self.writer.styles.is_missing(style, WD_STYLE_TYPE.PARAGRAPH):
             style = None
 
         curloc = self.current_state.location
         if isinstance(curloc, _Cell):
-            if len(curloc.paragraphs) == 1:
-                if not curloc.paragraphs[0].text:
+            if self.current_state.paragraphs == 1:
+                if not emitter.get_text(self.current_state.first_paragraph):
                     # An empty paragraph is created when a Cell is created.
                     # Reuse this paragraph.
-                    self.current_paragraph = curloc.paragraphs[0]
-                    self.current_paragraph.style = style
+                    self.current_paragraph = self.current_state.first_paragraph
+                    self.set_style(self.current_paragraph, style)
                 else:
                     self.current_paragraph = self.add_paragraph(curloc, style=style)
             else:
                 self.current_paragraph = self.add_paragraph(curloc, style=style)
         else:
             self.current_paragraph = self.add_paragraph(curloc, style=style)
+        self.current_style = style
 
     depart_list_item = just_print
 
     def visit_paragraph(self, node):
-        dprint()
-
+        self.flush_text()
         curloc = self.current_state.location
 
-        if 'List' in self.current_paragraph.style.name and not self.current_paragraph.text:
+        if self.current_style and 'List' in self.current_style and \
+                not emitter.get_text(self.current_paragraph):
             # This is the first paragraph in a list item, so do not create another one.
             pass
         elif isinstance(curloc, _Cell):
-            if len(curloc.paragraphs) == 1:
-                if not curloc.paragraphs[0].text:
-                    # An empty paragraph is created when a Cell is created.
-                    # Reuse this paragraph.
-                    self.current_paragraph = curloc.paragraphs[0]
-                else:
-                    self.current_paragraph = self.add_paragraph(curloc)
-            else:
-                self.current_paragraph = self.add_paragraph(curloc)
             # HACK because the style is messed up, TODO FIX
-            self.current_paragraph.paragraph_format.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
-            self.current_paragraph.paragraph_format.left_indent = 0
+            alignment, left_indent = 'left', 0
+            if self.current_state.paragraphs == 1 and \
+                    not emitter.get_text(self.current_state.first_paragraph):
+                # An empty paragraph is created when a Cell is created.
+                # Reuse this paragraph.
+                self.current_paragraph = self.current_state.first_paragraph
+                emitter.set_paragraph_properties(
+                    self.current_paragraph,
+                    self.writer.get_paragraph_properties(
+                        alignment=alignment, left_indent=left_indent))
+            else:
+                self.current_paragraph = self.add_paragraph(
+                    curloc, alignment=alignment, left_indent=left_indent)
         else:
             self.current_paragraph = self.add_paragraph(curloc)
 
     depart_paragraph = just_print
 
     def visit_literal_block(self, node):
-        dprint()
         # TODO: Check whether literal blocks work in tables and lists.
         self.in_literal_block = True
 
-        logger.info('ATTRIBUTES::{}'.format(repr(node.attlist())))
-
         # Unlike with Lists, there will not be a visit to paragraph in a
         # literal block, so we *must* create the paragraph here.
         style = 'Preformatted Text'
-        try:
-            # Check whether the style is part of the document.
-            self.docx_container.styles.get_style_id(style, WD_STYLE_TYPE.PARAGRAPH)
-        except KeyError as exc:
-            msg = 'looks like style "{}" is missing\n{}\n using no style'.format(
-                style, repr(exc))
-            logger.warning(msg)
+        if self.writer.styles.is_missing(style, WD_STYLE_TYPE.PARAGRAPH):
             style = None
 
-        self.current_paragraph = self.add_paragraph(self.current_state.location, style=style)
-        self.current_paragraph.paragraph_format.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
+        self.current_paragraph = self.add_paragraph(
+            self.current_state.location, style=style, alignment='left')
 
     def depart_literal_block(self, node):
-        dprint()
         self.in_literal_block = False
 
     ######## UNIMPLEMENTED NODES
     depart_start_of_file = just_print
 
     visit_document = just_print
-    depart_document = just_print
+
+    def depart_document(self, node):
+        self.flush_text()
 
     visit_highlightlang = print_and_skip
 
@@ -677,7 +1150,6 @@ class DocxTranslator(nodes.NodeVisitor):
     depart_desc_content = print_and_skip
 
     def visit_productionlist(self, node):
-        dprint()
         raise nodes.SkipNode
         # names = []
         # for production in node:
@@ -696,14 +1168,12 @@ class DocxTranslator(nodes.NodeVisitor):
     depart_seealso = just_print
 
     def visit_footnote(self, node):
-        dprint()
         raise nodes.SkipNode
         # self._footnote = node.children[0].astext().strip()
 
     depart_footnote = print_and_skip
 
     def visit_citation(self, node):
-        dprint()
         raise nodes.SkipNode
         # if len(node) and isinstance(node[0], nodes.label):
         #     self._citlabel = node[0].astext()
@@ -713,32 +1183,26 @@ class DocxTranslator(nodes.NodeVisitor):
     depart_citation = print_and_skip
 
     def visit_label(self, node):
-        dprint()
         raise nodes.SkipNode
 
     # XXX: option list could use some better styling
 
     visit_option_list = just_print
 
-    def depart_option_list(self, node):
-        dprint()
-        pass
+    depart_option_list = just_print
 
     visit_option_list_item = print_and_skip
     depart_option_list_item = print_and_skip
 
     def visit_option_group(self, node):
-        dprint()
         raise nodes.SkipNode
         # self._firstoption = True
 
     def depart_option_group(self, node):
-        dprint()
         raise nodes.SkipNode
         # self.add_text('     ')
 
     def visit_option(self, node):
-        dprint()
         raise nodes.SkipNode
         # if self._firstoption:
         #     self._firstoption = False
@@ -747,14 +1211,11 @@ class DocxTranslator(nodes.NodeVisitor):
 
     depart_option = just_print
 
-    def visit_option_string(self, node):
-        dprint()
-        pass
+    visit_option_string = just_print
 
     depart_option_string = just_print
 
     def visit_option_argument(self, node):
-        dprint()
         raise nodes.SkipNode
         # self.add_text(node['delimiter'])
 
@@ -770,38 +1231,31 @@ class DocxTranslator(nodes.NodeVisitor):
     depart_tbody = just_print
 
     def visit_acks(self, node):
-        dprint()
         raise nodes.SkipNode
         # self.add_text(', '.join(n.astext() for n in node.children[0].children)
         #               + '.')
 
     def visit_transition(self, node):
-        dprint()
         raise nodes.SkipNode
         # self.add_text('=' * 70)
 
     def visit_definition_list(self, node):
-        dprint()
         raise nodes.SkipNode
         # self.list_style.append(-2)
 
     def depart_definition_list(self, node):
-        dprint()
         raise nodes.SkipNode
         # self.list_style.pop()
 
     visit_definition_list_item = print_and_skip
 
-    def depart_definition_list_item(self, node):
-        dprint()
-        pass
+    depart_definition_list_item = just_print
 
     visit_term = print_and_skip
 
     depart_term = print_and_skip
 
     def visit_classifier(self, node):
-        dprint()
         raise nodes.SkipNode
         # self.add_text(' : ')
 
@@ -813,20 +1267,15 @@ class DocxTranslator(nodes.NodeVisitor):
 
     visit_field_list = just_print
 
-    def depart_field_list(self, node):
-        dprint()
-        pass
+    depart_field_list = just_print
 
     visit_field = just_print
 
-    def depart_field(self, node):
-        dprint()
-        pass
+    depart_field = just_print
 
     visit_field_name = print_and_skip
 
     def depart_field_name(self, node):
-        dprint()
         raise nodes.SkipNode
         # self.add_text(':')
 
@@ -836,21 +1285,15 @@ class DocxTranslator(nodes.NodeVisitor):
 
     visit_centered = just_print
 
-    def depart_centered(self, node):
-        dprint()
-        pass
+    depart_centered = just_print
 
     visit_hlist = just_print
 
-    def depart_hlist(self, node):
-        dprint()
-        pass
+    depart_hlist = just_print
 
     visit_hlistcol = just_print
 
-    def depart_hlistcol(self, node):
-        dprint()
-        pass
+    depart_hlistcol = just_print
 
     visit_admonition = print_and_skip
 
@@ -878,7 +1321,6 @@ class DocxTranslator(nodes.NodeVisitor):
     depart_warning = _make_depart_admonition('warning')
 
     def visit_versionmodified(self, node):
-        dprint()
         raise nodes.SkipNode
         # from sphinx.locale import admonitionlabels, versionlabels, _
         # if node.children:
@@ -900,14 +1342,11 @@ class DocxTranslator(nodes.NodeVisitor):
 
     visit_line = just_print
 
-    def depart_line(self, node):
-        dprint()
-        pass
+    depart_line = just_print
 
     visit_block_quote = just_print
 
-    def depart_block_quote(self, node):
-        dprint()
+    depart_block_quote = just_print
 
     visit_compact_paragraph = just_print
 
@@ -922,103 +1361,80 @@ class DocxTranslator(nodes.NodeVisitor):
     visit_pending_xref = just_print
     depart_pending_xref = just_print
 
-    visit_reference = just_print
-    depart_reference = just_print
+    def visit_reference(self, node):
+        self.push_formatting('link')
+
+    depart_reference = pop_formatting
 
     visit_download_reference = just_print
     depart_download_reference = just_print
 
     def visit_literal_emphasis(self, node):
-        dprint()
-        # self.add_text('*')
+        self.push_formatting('italic', 'code')
 
-    def depart_literal_emphasis(self, node):
-        dprint()
-        # self.add_text('*')
+    depart_literal_emphasis = pop_formatting
 
-    def visit_abbreviation(self, node):
-        dprint()
-        # self.add_text('')
+    # self.add_text('')
+    visit_abbreviation = just_print
 
-    def depart_abbreviation(self, node):
-        dprint()
-        # if node.hasattr('explanation'):
-        #     self.add_text(' (%s)' % node['explanation'])
+    # if node.hasattr('explanation'):
+    #     self.add_text(' (%s)' % node['explanation'])
+    depart_abbreviation = just_print
 
-    def visit_title_reference(self, node):
-        dprint()
-        # self.add_text('*')
+    # self.add_text('*')
+    visit_title_reference = just_print
 
-    def depart_title_reference(self, node):
-        dprint()
-        # self.add_text('*')
+    # self.add_text('*')
+    depart_title_reference = just_print
 
     def visit_literal(self, node):
-        dprint()
-        # self.add_text('``')
+        self.push_formatting('code')
 
-    def depart_literal(self, node):
-        dprint()
-        # self.add_text('``')
+    depart_literal = pop_formatting
 
     def visit_subscript(self, node):
-        dprint()
-        raise nodes.SkipNode
-        # self.add_text('_')
+        self.push_formatting('subscript')
 
-    depart_subscript = just_print
+    depart_subscript = pop_formatting
 
     def visit_superscript(self, node):
-        dprint()
-        raise nodes.SkipNode
-        # self.add_text('^')
+        self.push_formatting('superscript')
 
-    depart_superscript = just_print
+    depart_superscript = pop_formatting
 
     def visit_footnote_reference(self, node):
-        dprint()
         raise nodes.SkipNode
         # self.add_text('[%s]' % node.astext())
 
     def visit_citation_reference(self, node):
-        dprint()
         raise nodes.SkipNode
         # self.add_text('[%s]' % node.astext())
 
-    def visit_generated(self, node):
-        dprint()
-        pass
+    visit_generated = just_print
 
     depart_generated = just_print
 
-    def visit_inline(self, node):
-        dprint()
-        pass
+    visit_inline = just_print
 
     depart_inline = just_print
 
     def visit_problematic(self, node):
-        dprint()
         raise nodes.SkipNode
         # self.add_text('>>')
 
     def depart_problematic(self, node):
-        dprint()
         raise nodes.SkipNode
         # self.add_text('<<')
 
     def visit_system_message(self, node):
-        dprint()
         raise nodes.SkipNode
         # self.add_text('<SYSTEM MESSAGE: %s>' % node.astext())
 
     def visit_meta(self, node):
-        dprint()
         raise nodes.SkipNode
         # only valid for HTML
 
     def visit_raw(self, node):
-        dprint()
         raise nodes.SkipNode
         # if 'text' in node.get('format', '').split():
         #     self.body.append(node.astext())
@@ -1027,11 +1443,95 @@ class DocxTranslator(nodes.NodeVisitor):
     depart_container = just_print
 
     def unknown_visit(self, node):
-        dprint()
         raise nodes.SkipNode
         # raise NotImplementedError('Unknown node: ' + node.__class__.__name__)
 
     def unknown_departure(self, node):
-        dprint()
         raise nodes.SkipNode
         # raise NotImplementedError('Unknown node: ' + node.__class__.__name__)
+
+
+SKIP_NODE = object()
+"Visit handler in the dispatch table of nodes that are skipped."
+_just_print = DocxTranslator.__dict__['just_print']
+_print_and_skip = DocxTranslator.__dict__['print_and_skip']
+
+
+class DocxTracingTranslator(DocxTranslator):
+    """
+    DocxTranslator logging the nodes it visits and departs, see docx_trace.
+
+    docx_trace is either True or a list of the node class names to trace,
+    at most docx_trace_limit lines are logged per document.  DocxTranslator
+    itself does not trace at all.
+    """
+
+    def __init__(self, document, builder, writer):
+        DocxTranslator.__init__(self, document, builder, writer)
+        trace = builder.config.docx_trace
+        self.trace_nodes = None
+        "Names of the node classes to trace, None for all."
+        if isinstance(trace, (list, tuple, set)):
+            self.trace_nodes = set(trace)
+        self.trace_lines = builder.config.docx_trace_limit
+        "Number of lines left to log."
+
+    def trace(self, event, node):
+        name = node.__class__.__name__
+        if self.trace_lines <= 0 or (self.trace_nodes is not None and
+                                     name not in self.trace_nodes):
+            return
+        depth = 0
+        parent = node.parent
+        while parent is not None:
+            depth += 1
+            parent = parent.parent
+        details = ''
+        if event != 'visit':
+            pass
+        elif isinstance(node, nodes.Text):
+            details = repr(node.astext())
+        else:
+            details = ' '.join('{}={!r}'.format(k, v) for k, v in
+                               sorted(node.attributes.items()) if v)
+        logger.info('{}{} {} {}'.format(
+            '  ' * depth, event, name, details[:200]).rstrip())
+        self.trace_lines -= 1
+        if not self.trace_lines:
+            logger.info('docx_trace_limit reached, no more tracing of {}'.format(
+                self.document.get('docname')))
+
+    @classmethod
+    def get_handlers(cls, node_class):
+        """
+        Return the handlers of DocxTranslator.get_handlers(), wrapped to
+        trace the visits, skips and departures.
+        """
+        table = cls.__dict__.get('traced_dispatch_table')
+        if table is None:
+            table = cls.traced_dispatch_table = {}
+        if node_class in table:
+            return table[node_class]
+        visit, depart = super(DocxTracingTranslator, cls).get_handlers(
+            node_class)
+
+        def traced_visit(self, node):
+            self.trace('visit', node)
+            try:
+                if visit is SKIP_NODE:
+                    raise nodes.SkipNode
+                if visit is not None:
+                    visit(self, node)
+            except nodes.SkipNode:
+                self.trace('skip', node)
+                raise
+
+        def traced_depart(self, node):
+            self.trace('depart', node)
+            if depart is SKIP_NODE:
+                _print_and_skip(self, node)
+            elif depart is not None:
+                depart(self, node)
+
+        table[node_class] = (traced_visit, traced_depart)
+        return table[node_class]
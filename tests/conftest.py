@@ -0,0 +1,48 @@
+import shutil
+
+import pytest
+
+import docxsphinx
+from docxsphinx import api
+
+CONF = """\
+extensions = ['docxsphinx']
+master_doc = 'index'
+project = 'test'
+"""
+
+
+class Project(object):
+    """A Sphinx project in a temporary directory, see the project fixture."""
+
+    def __init__(self, tmpdir):
+        self.tmpdir = tmpdir
+        self.srcdir = str(tmpdir.join('source'))
+
+    def write(self, index, conf=CONF):
+        """Write a project with the contents *index* for index.rst."""
+        srcdir = self.tmpdir.mkdir('source')
+        srcdir.join('conf.py').write(conf)
+        srcdir.join('index.rst').write(index)
+
+    def copy(self, example='sample_1'):
+        """Copy the sources of one of the examples."""
+        shutil.copytree('examples/{}/source'.format(example), self.srcdir)
+
+    def outdir(self, name='build'):
+        return str(self.tmpdir.join(name))
+
+    def build(self, outdir='build', **overrides):
+        """Build with docxsphinx.build() and return the docx file names."""
+        return docxsphinx.build(self.srcdir, self.outdir(outdir),
+                                status=None, **overrides)
+
+
+@pytest.fixture
+def project(tmpdir):
+    """
+    A Project to build.  The applications kept by docxsphinx.build() are
+    dropped afterwards, also when the test fails.
+    """
+    yield Project(tmpdir)
+    api.clear_cache()
@@ -0,0 +1,27 @@
+import os
+import time
+
+from docxsphinx import api
+
+
+def test_build(project):
+    project.copy()
+    outdir = project.outdir()
+
+    filenames = project.build()
+    assert filenames == [os.path.join(outdir, 'example-0.1.docx')]
+    assert os.path.isfile(filenames[0])
+    app = list(api._apps.values())[-1][0]
+
+    # The application is kept, only the changed document is read again.
+    time.sleep(1)
+    with open(os.path.join(project.srcdir, 'restructuredtext.rst'), 'a') as f:
+        f.write('\nAnother paragraph.\n')
+    assert project.build() == filenames
+    assert list(api._apps.values())[-1][0] is app
+
+    # Overrides need an application of their own.
+    filenames = project.build(version='0.2')
+    assert filenames == [os.path.join(outdir, 'example-0.2.docx')]
+    assert os.path.isfile(filenames[0])
+    assert list(api._apps.values())[-1][0] is not app
@@ -1,7 +1,9 @@
 import os
+import re
 from subprocess import Popen
 import shlex
 import shutil
+import zipfile
 import pytest
 
 @pytest.mark.parametrize("example_dir, expected_docx_filename",
@@ -22,3 +24,30 @@ def test_examples(example_dir, expected_docx_filename):
         cwd=example_dir
     ).wait()
     assert os.path.isfile(os.path.join(build_dir, expected_docx_filename))
+
+
+def test_parallel_build_matches_serial_build(tmpdir):
+    documents = []
+    for command in ("sphinx-build -b docx source {}",
+                    "sphinx-build -j 4 -b docx source {}"):
+        build_dir = str(tmpdir.join(str(len(documents))))
+        Popen(
+            shlex.split(command.format(build_dir)),
+            cwd='examples/sample_1'
+        ).wait()
+        with zipfile.ZipFile(os.path.join(build_dir, 'example-0.1.docx')) as docx:
+            xml = docx.read('word/document.xml')
+        documents.append(re.sub(b'>\\s+<', b'><', xml))
+    assert documents[0] == documents[1]
+
+
+def test_split_build(tmpdir):
+    build_dir = str(tmpdir)
+    Popen(
+        shlex.split(
+            "sphinx-build -b docx -D docx_split=1 source {}".format(build_dir)
+        ),
+        cwd='examples/sample_1'
+    ).wait()
+    assert sorted(f for f in os.listdir(build_dir) if f.endswith('.docx')) == \
+        ['index-ja.docx', 'restructuredtext.docx']
@@ -0,0 +1,23 @@
+from docutils import nodes
+
+from docxsphinx.writer import SKIP_NODE, DocxTranslator
+
+
+class custom_paragraph(nodes.paragraph):
+    pass
+
+
+class unknown_node(nodes.Element):
+    pass
+
+
+def test_handlers_of_base_class_are_used():
+    assert DocxTranslator.get_handlers(custom_paragraph) == (
+        DocxTranslator.visit_paragraph, None)
+
+
+def test_handlers_doing_nothing_are_left_out():
+    assert DocxTranslator.get_handlers(nodes.inline) == (None, None)
+    assert DocxTranslator.get_handlers(nodes.topic) == (SKIP_NODE, SKIP_NODE)
+    assert DocxTranslator.get_handlers(unknown_node) == (
+        DocxTranslator.unknown_visit, DocxTranslator.unknown_departure)
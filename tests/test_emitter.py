@@ -0,0 +1,134 @@
+from docx import Document
+from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+from docx.shared import Cm, Twips
+
+from docxsphinx import emitter
+
+
+def test_paragraphs_are_built_like_python_docx():
+    expected = Document()
+    p = expected.add_paragraph(' leading space')
+    run = p.add_run('tab\tand\nbreak ')
+    run.bold = True
+    run.italic = True
+    p.style = 'Heading 1'
+    p.paragraph_format.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+    p.paragraph_format.left_indent = 0
+    expected.add_paragraph()._p.style = None
+
+    document = Document()
+    body = document.element.body
+    p = emitter.add_paragraph(body, emitter.make_paragraph_properties(
+        body, alignment='center'))
+    emitter.add_run(p, ' leading space')
+    emitter.add_run(p, 'tab\tand\nbreak ', emitter.make_run_properties(
+        body, bold=True, italic=True))
+    emitter.set_style(p, 'Heading1')
+    emitter.set_paragraph_properties(p, emitter.make_paragraph_properties(
+        body, left_indent=0))
+    emitter.set_style(emitter.add_paragraph(body), None)
+
+    assert body.xml == expected.element.body.xml
+    assert emitter.get_text(p) == expected.paragraphs[0].text
+
+
+def test_blocks_go_before_the_section_properties():
+    document = Document()
+    body = document.element.body
+    assert emitter.get_last_block(body) is None
+    first = document.add_paragraph()._p
+    assert emitter.get_last_block(body) is first
+    added = [emitter.add_paragraph(body) for _ in range(3)]
+    assert body[-1].tag == emitter.W_SECTPR
+    assert emitter.get_last_block(body) is added[-1]
+    assert list(emitter.iter_blocks_after(body, first)) == added
+    assert list(emitter.iter_blocks_after(body, None)) == [first] + added
+
+
+def test_rows_are_built_like_python_docx():
+    expected = Document()
+    table = expected.add_table(rows=0, cols=0)
+    table.add_column(Cm(3))
+    table.add_column(Cm(2))
+    table.add_row()
+
+    document = Document()
+    table = document.add_table(rows=0, cols=0)
+    table.add_column(Cm(3))
+    table.add_column(Cm(2))
+    tbl = table._tbl
+    widths = [str(Cm(3).twips), str(Cm(2).twips)]
+    tbl.append(emitter.make_row(tbl, widths))
+
+    assert document.element.body.xml == expected.element.body.xml
+
+
+def test_removed_block_keeps_its_content():
+    document = Document()
+    table = document.add_table(rows=3, cols=2)
+    table.cell(1, 1).text = 'text'
+    body = document.element.body
+    tags = [e.tag for e in table._tbl.iter()]
+    emitter.remove_block(body, table._tbl)
+    assert table._tbl.getparent() is None
+    assert [e.tag for e in table._tbl.iter()] == tags
+    assert table.cell(1, 1).text == 'text'
+
+
+def test_spans_are_built_like_merged_cells():
+    expected = Document()
+    table = expected.add_table(rows=0, cols=0)
+    for _ in range(4):
+        table.add_column(Cm(2))
+    cells = table.add_row().cells
+    cells[0].merge(cells[2])
+
+    document = Document()
+    table = document.add_table(rows=0, cols=0)
+    for _ in range(4):
+        table.add_column(Cm(2))
+    tbl = table._tbl
+    tbl.append(emitter.make_row(tbl, [str(Cm(2).twips)] * 4, [3]))
+
+    assert document.element.body.xml == expected.element.body.xml
+
+
+def test_row_spans_are_built_like_merged_cells():
+    expected = Document()
+    table = expected.add_table(rows=0, cols=0)
+    for _ in range(3):
+        table.add_column(Cm(2))
+    for _ in range(3):
+        table.add_row()
+    table.cell(0, 1).merge(table.cell(2, 2))
+
+    document = Document()
+    table = document.add_table(rows=0, cols=0)
+    for _ in range(3):
+        table.add_column(Cm(2))
+    tbl = table._tbl
+    widths = [str(Cm(2).twips)] * 3
+    tbl.append(emitter.make_row(tbl, widths, [1, 2], [None, 'restart']))
+    for _ in range(2):
+        tbl.append(emitter.make_row(tbl, widths, [1, 2], [None, 'continue']))
+
+    assert document.element.body.xml == expected.element.body.xml
+
+
+def test_rows_are_copied_from_a_prototype():
+    expected = Document()
+    table = expected.add_table(rows=0, cols=0)
+    table.add_column(Twips(1000))
+    table.add_column(Twips(500))
+    table.add_row()
+    table.add_row()
+
+    document = Document()
+    table = document.add_table(rows=0, cols=0)
+    tbl = table._tbl
+    emitter.add_grid_columns(tbl, ['1000', '500'])
+    prototype = emitter.make_row(tbl, ['1000', '500'])
+    rows = [emitter.copy_row(tbl, prototype) for _ in range(2)]
+
+    assert document.element.body.xml == expected.element.body.xml
+    assert rows[0] is not rows[1] and prototype.getparent() is None
@@ -0,0 +1,147 @@
+import json
+import os
+import pickle
+import re
+from subprocess import Popen, PIPE
+import shlex
+import shutil
+import time
+import zipfile
+
+from sphinx.util.osutil import ensuredir
+
+from docxsphinx.fragment import FragmentCache
+
+
+def build(example_dir):
+    process = Popen(
+        shlex.split(
+            "sphinx-build -b docx source build"
+        ),
+        cwd=example_dir,
+        stdout=PIPE,
+        universal_newlines=True
+    )
+    output = process.communicate()[0]
+    assert process.returncode == 0
+    return output
+
+
+def test_only_changed_documents_are_translated(tmpdir):
+    example_dir = str(tmpdir.join('sample_1'))
+    shutil.copytree('examples/sample_1', example_dir)
+    shutil.rmtree(os.path.join(example_dir, 'build'), ignore_errors=True)
+    docx_filename = os.path.join(example_dir, 'build', 'example-0.1.docx')
+
+    build(example_dir)
+    assert os.path.isfile(docx_filename)
+
+    assert 'no targets are out of date' in build(example_dir)
+
+    # Re-read, but with the same contents: taken from the fragment cache.
+    source_filename = os.path.join(example_dir, 'source', 'restructuredtext.rst')
+    time.sleep(1)
+    os.utime(source_filename, None)
+    assert translated_docnames(build(example_dir)) == []
+
+    with open(source_filename, 'a') as f:
+        f.write('\nAnother paragraph.\n')
+    assert translated_docnames(build(example_dir)) == ['restructuredtext']
+    assert os.path.isfile(docx_filename)
+
+
+def translated_docnames(output):
+    translated = output.split('translating outdated documents...')[1]
+    return translated.splitlines()[0].split()
+
+
+def test_fragment_cache_is_shared_between_checkouts(tmpdir):
+    cache_dir = str(tmpdir.join('cache'))
+    outputs = []
+    for checkout in ('checkout_1', 'checkout_2'):
+        example_dir = str(tmpdir.join(checkout))
+        shutil.copytree('examples/sample_1', example_dir)
+        shutil.rmtree(os.path.join(example_dir, 'build'), ignore_errors=True)
+        outputs.append(Popen(
+            shlex.split(
+                "sphinx-build -b docx -D docx_cache_dir={} source build".format(
+                    cache_dir)
+            ),
+            cwd=example_dir,
+            stdout=PIPE,
+            universal_newlines=True
+        ).communicate()[0])
+    assert translated_docnames(outputs[0]) == [
+        'index', 'index-ja', 'restructuredtext']
+    assert translated_docnames(outputs[1]) == []
+    assert '3 hits, 0 misses' in outputs[1]
+
+
+class CreateFile(object):
+    """Unpickling this creates a file, like any code could be run."""
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    def __reduce__(self):
+        return open, (self.filename, 'w')
+
+
+def test_fragment_cache_entries_are_not_unpickled(project):
+    project.copy()
+    cache_dir = project.outdir('cache')
+    first = project.build('first', docx_cache_dir=cache_dir)[0]
+
+    entries = []
+    for dirpath, _, filenames in os.walk(cache_dir):
+        entries.extend(os.path.join(dirpath, f) for f in filenames)
+    assert len(entries) == 3
+    images = {}
+    for entry in entries:
+        with open(entry) as f:
+            images.update(json.load(f)['images'])
+    assert len(images) == 1
+
+    # Taken from the cache, with the image.
+    second = project.build('second', docx_cache_dir=cache_dir)[0]
+    assert read_document(second) == read_document(first)
+    with zipfile.ZipFile(second) as docx:
+        assert len([n for n in docx.namelist()
+                    if n.startswith('word/media/')]) == 1
+
+    created = project.outdir('created')
+    for entry in entries:
+        with open(entry, 'wb') as f:
+            pickle.dump(CreateFile(created), f)
+    third = project.build('third', docx_cache_dir=cache_dir)[0]
+    assert not os.path.exists(created)
+    assert read_document(third) == read_document(first)
+
+
+def read_document(filename):
+    """Return document.xml, without the blank text left out when parsing."""
+    with zipfile.ZipFile(filename) as docx:
+        return re.sub(br'>\s+<', b'><', docx.read('word/document.xml'))
+
+
+def test_malformed_fragment_cache_entries_are_misses(tmpdir):
+    cache = FragmentCache(str(tmpdir), 1024 * 1024)
+    entries = [
+        b'not json',
+        b'[]',
+        b'{}',
+        b'{"docname": "index", "elements": [], "images": [],'
+        b' "toctrees": [], "runs_saved": 0}',
+        b'{"docname": "index", "elements": [1], "images": {},'
+        b' "toctrees": [], "runs_saved": 0}',
+        b'{"docname": "index", "elements": ["<w:p"], "images": {},'
+        b' "toctrees": [], "runs_saved": 0}',
+    ]
+    for i, data in enumerate(entries):
+        key = '%040x' % i
+        filename = cache.get_filename(key)
+        ensuredir(os.path.dirname(filename))
+        with open(filename, 'wb') as f:
+            f.write(data)
+        assert cache.get(key) is None
+    assert cache.stats['misses'] == len(entries)
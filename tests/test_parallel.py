@@ -0,0 +1,45 @@
+import os
+import shutil
+
+from sphinx.application import Sphinx
+
+
+def make_app(tmpdir, buildername):
+    srcdir = str(tmpdir.join('source'))
+    shutil.copytree('examples/sample_2/source', srcdir)
+    shutil.copy('examples/sample_1/source/image1.png', srcdir)
+    # Enough documents for Sphinx to consider reading them in parallel.
+    for i in range(6):
+        with open(os.path.join(srcdir, 'chapter%d.rst' % i), 'w') as f:
+            f.write('Chapter %d\n=========\n\nSome text.\n\n'
+                    '.. image:: image1.png\n' % i)
+    outdir = str(tmpdir.join('build'))
+    return Sphinx(srcdir, srcdir, outdir, os.path.join(outdir, '.doctrees'),
+                  buildername, parallel=2)
+
+
+def test_extension_is_parallel_safe(tmpdir):
+    app = make_app(tmpdir, 'html')
+    assert app.is_parallel_allowed('read')
+    assert app.is_parallel_allowed('write')
+
+
+def test_parallel_docx_build(tmpdir):
+    app = make_app(tmpdir, 'docx')
+    app.build()
+    assert app.statuscode == 0
+    assert app.builder.parallel_ok
+    assert os.path.isfile(
+        str(tmpdir.join('build', 'my_foo_project-0.0.0.docx')))
+
+
+def test_image_metadata_is_collected_while_reading(tmpdir):
+    app = make_app(tmpdir, 'docx')
+    app.build()
+    assert app.statuscode == 0
+    for i in range(6):
+        metadata = app.env.docx_images['chapter%d' % i]['image1.png']
+        assert metadata['content_type'] == 'image/png'
+        assert (metadata['px_width'], metadata['px_height']) == (211, 71)
+        assert metadata['size'] == os.path.getsize(
+            'examples/sample_1/source/image1.png')
@@ -0,0 +1,50 @@
+from docx import Document
+
+INDEX = """\
+Runs
+====
+
+Plain text with ``code``, a `link <http://example.com>`_ and more text,
+then **strong**\\ **er** text and *emphasis*.
+
+*Nested* :sup:`super` :samp:`code {with} emphasis` H\\ :sub:`2`\\ O.
+"""
+
+
+def get_paragraph(project, start):
+    project.write(INDEX)
+    filenames = project.build()
+    return [p for p in Document(filenames[0]).paragraphs
+            if p.text.startswith(start)][0]
+
+
+def test_text_with_the_same_formatting_is_joined(project):
+    paragraph = get_paragraph(project, 'Plain')
+    assert [(r.text, bool(r.bold), bool(r.italic))
+            for r in paragraph.runs] == [
+        ('Plain text with ', False, False),
+        ('code', False, False),
+        (', a link and more text, then ', False, False),
+        ('stronger', True, False),
+        (' text and ', False, False),
+        ('emphasis', False, True),
+        ('.', False, False),
+    ]
+    assert paragraph.runs[1].font.name == 'Courier New'
+
+
+def test_nested_formatting(project):
+    paragraph = get_paragraph(project, 'Nested')
+    assert [(r.text, bool(r.italic), r.font.name, r.font.superscript,
+             r.font.subscript) for r in paragraph.runs] == [
+        ('Nested', True, None, None, None),
+        (' ', False, None, None, None),
+        ('super', False, None, True, False),
+        (' ', False, None, None, None),
+        ('code ', False, 'Courier New', None, None),
+        ('with', True, 'Courier New', None, None),
+        (' emphasis', False, 'Courier New', None, None),
+        (' H', False, None, None, None),
+        ('2', False, None, False, True),
+        ('O.', False, None, None, None),
+    ]
@@ -0,0 +1,40 @@
+from docx import Document
+from docx.oxml.ns import qn
+
+from docxsphinx import emitter, snippets
+from docxsphinx.fragment import renumber_seq_fields
+
+
+def test_slots_are_filled_in():
+    document = Document()
+    p = emitter.add_paragraph(document.element.body)
+    snippets.CAPTION.append_to(
+        p, label='Figure ', instruction=snippets.seq_instruction('Figure'),
+        result=1, separator=': ')
+    snippets.BOOKMARK.append_to(p, id=7, name='fig-1')
+    texts = [t.text for t in p.iter(qn('w:t'))]
+    assert texts == ['Figure ', '1', ': ']
+    assert [t.get(qn('xml:space')) for t in p.iter(qn('w:t'))] == [
+        'preserve', None, 'preserve']
+    assert p.find('.//' + qn('w:instrText')).text == ' SEQ Figure \\* ARABIC '
+    assert [b.get(qn('w:id')) for b in p[-2:]] == ['7', '7']
+    assert p[-2].get(qn('w:name')) == 'fig-1'
+
+
+def test_snippet_is_copied_on_each_use():
+    first = snippets.FIELD.clone(instruction=' PAGE ', result=1)
+    second = snippets.FIELD.clone(instruction=' PAGE ', result=2)
+    assert first[0] is not second[0]
+    assert snippets.FIELD.container[3][0].text == '{result}'
+
+
+def test_seq_fields_are_renumbered():
+    document = Document()
+    p = emitter.add_paragraph(document.element.body)
+    for _ in range(2):
+        snippets.FIELD.append_to(
+            p, instruction=snippets.seq_instruction('Table'), result=1)
+    counters = {'Table': 3}
+    renumber_seq_fields(p, counters)
+    assert [t.text for t in p.iter(qn('w:t'))] == ['4', '5']
+    assert counters == {'Table': 5}
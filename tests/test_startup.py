@@ -0,0 +1,51 @@
+import os
+import shutil
+import subprocess
+import sys
+
+IMPORT_BUDGET = 0.5
+"Seconds importing docxsphinx may take, on top of Sphinx itself."
+
+IMPORT_SCRIPT = """
+import sys, time
+import sphinx.application
+start = time.time()
+import docxsphinx
+print(time.time() - start)
+print(' '.join(sorted(m for m in sys.modules
+                      if m.split('.')[0] in ('docx', 'lxml') or
+                      m == 'docxsphinx.writer')))
+"""
+
+HTML_BUILD_SCRIPT = """
+import sys
+from sphinx.application import Sphinx
+app = Sphinx('source', 'source', 'build', 'build/.doctrees', 'html',
+             status=None)
+app.build()
+print(' '.join(sorted(m for m in sys.modules
+                      if m.split('.')[0] == 'docx' or
+                      m == 'docxsphinx.writer')))
+"""
+
+
+def run(script, cwd):
+    return subprocess.check_output([sys.executable, '-c', script], cwd=cwd,
+                                   universal_newlines=True).splitlines()
+
+
+def test_import_is_fast_and_has_no_side_effects(tmpdir):
+    seconds, modules = run(IMPORT_SCRIPT, str(tmpdir))
+    assert float(seconds) < IMPORT_BUDGET
+    assert modules == ''
+    assert tmpdir.listdir() == []
+
+
+def test_other_builders_do_not_load_the_writer(tmpdir):
+    example_dir = str(tmpdir.join('sample_1'))
+    shutil.copytree('examples/sample_1/source',
+                    os.path.join(example_dir, 'source'))
+    modules, = run(HTML_BUILD_SCRIPT, example_dir)
+    assert modules == ''
+    assert sorted(os.listdir(example_dir)) == ['build', 'source']
+    assert not os.path.exists(os.path.join(example_dir, 'build', 'docx.log'))
@@ -0,0 +1,97 @@
+import gc
+import threading
+import weakref
+import zipfile
+
+import pytest
+from sphinx.errors import ConfigError
+
+from docxsphinx import builder as builder_module
+from docxsphinx.builder import StreamingFragments
+from docxsphinx.fragment import DocxFragment
+
+
+def read_parts(filename):
+    with zipfile.ZipFile(filename) as f:
+        return dict((name, f.read(name)) for name in f.namelist())
+
+
+def test_streamed_document_is_the_same(project):
+    project.copy()
+    expected, = project.build('saved')
+    streamed, = project.build('streamed', docx_streaming=True)
+    assert read_parts(streamed) == read_parts(expected)
+
+
+class Doctree(object):
+    pass
+
+
+class Builder(object):
+    """Just what StreamingFragments needs of a DocxBuilder."""
+
+    def __init__(self, failing=()):
+        self.failing = failing
+        self.loaded = []
+        "(docname, prefetch, thread) of every document loaded."
+        self.doctrees = {}
+        "Weak references to the doctrees loaded."
+        self.fragment_index = self  # see set_key()
+        self.runs_saved = 0
+
+    def load_document(self, docname, prefetch=False):
+        self.loaded.append((docname, prefetch, threading.current_thread()))
+        if docname in self.failing:
+            raise IOError('cannot read ' + docname)
+        doctree = Doctree()
+        self.doctrees[docname] = weakref.ref(doctree)
+        return 0, None, doctree
+
+    def translate_fragment(self, docname, doctree):
+        return docname, DocxFragment(docname, [], {}, []), True
+
+    def set_key(self, docname, mtime, key):
+        pass
+
+    def info(self, *args, **kwargs):
+        pass
+
+
+def test_prefetched_documents_are_used():
+    builder = Builder()
+    fragments = StreamingFragments(builder, ['a', 'b', 'c'])
+    assert [fragments[d].docname for d in ('a', 'b', 'c')] == ['a', 'b', 'c']
+    assert [(d, p) for d, p, _ in builder.loaded] == [
+        ('a', False), ('b', True), ('c', True)]
+    assert builder.loaded[0][2] is threading.current_thread()
+    assert builder.loaded[1][2] is not threading.current_thread()
+
+
+def test_prefetch_errors_reach_the_caller():
+    builder = Builder(failing=['b'])
+    fragments = StreamingFragments(builder, ['a', 'b'])
+    fragments['a']
+    with pytest.raises(IOError):
+        fragments['b']
+    assert [(d, p) for d, p, _ in builder.loaded] == [('a', False), ('b', True)]
+
+
+def test_only_one_doctree_is_kept():
+    builder = Builder()
+    docnames = ['a', 'b', 'c', 'd']
+    fragments = StreamingFragments(builder, docnames)
+    for docname in docnames:
+        fragments[docname]
+        if fragments.prefetched:
+            fragments.prefetched[1].join()
+        gc.collect()
+        alive = [d for d, ref in builder.doctrees.items() if ref() is not None]
+        # Only the one prefetched for the next document.
+        assert alive == docnames[docnames.index(docname) + 1:][:1]
+
+
+def test_streaming_needs_python_3_6(project, monkeypatch):
+    project.write('Streamed\n========\n')
+    monkeypatch.setattr(builder_module.sys, 'version_info', (2, 7, 18))
+    with pytest.raises(ConfigError):
+        project.build(docx_streaming=True)
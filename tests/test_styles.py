@@ -0,0 +1,33 @@
+import logging
+
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+
+from docxsphinx.styles import StyleResolver
+
+
+def test_style_ids_are_resolved_like_python_docx():
+    styles = Document().styles
+    resolver = StyleResolver(styles)
+    for name in ('Normal', 'Heading 1', 'Caption', 'List Bullet 2'):
+        assert resolver.get_style_id(name, WD_STYLE_TYPE.PARAGRAPH) == \
+            styles.get_style_id(name, WD_STYLE_TYPE.PARAGRAPH)
+    assert resolver.get_style_id('Light Shading', WD_STYLE_TYPE.TABLE) == \
+        styles.get_style_id('Light Shading', WD_STYLE_TYPE.TABLE)
+    assert resolver.get_style_id(None, WD_STYLE_TYPE.PARAGRAPH) is None
+
+
+def test_missing_style_is_warned_about_once(caplog):
+    resolver = StyleResolver(Document().styles)
+    with caplog.at_level(logging.WARNING, logger='docx'):
+        for _ in range(3):
+            assert resolver.is_missing('No Such Style',
+                                       WD_STYLE_TYPE.PARAGRAPH)
+            assert resolver.get_style_id('No Such Style',
+                                         WD_STYLE_TYPE.PARAGRAPH) is None
+        # A style of another type is missing as well.
+        assert resolver.is_missing('Heading 1', WD_STYLE_TYPE.TABLE)
+    assert [r.getMessage() for r in caplog.records] == [
+        'looks like style "No Such Style" is missing, using no style',
+        'looks like style "Heading 1" is missing, using no style',
+    ]
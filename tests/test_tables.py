@@ -0,0 +1,133 @@
+from docx import Document
+from docx.oxml.ns import qn
+from docx.shared import Cm
+
+INDEX = """\
+Tables
+======
+
+.. list-table::
+   :header-rows: 1
+
+   * - Name
+     - Description
+   * - one
+     - A paragraph.
+
+       Another paragraph.
+   * - two
+     - * A list item
+       * Another list item
+"""
+
+SPANS = """\
+Spans
+=====
+
++-----+-----------+-----+
+| Wide header     | c   |
++=====+=====+=====+=====+
+| a   | b   | Wider     |
++-----+-----+-----+-----+
+"""
+
+ROW_SPANS = """\
+Row spans
+=========
+
++-----+-----+-----+
+| a   | b   | c   |
++=====+=====+=====+
+| Tall      | d   |
+| and wide  +-----+
+|           | e   |
++-----+-----+-----+
+| f   | Tall      |
++-----+           |
+| g   |           |
++-----+-----------+
+"""
+
+WIDTHS = """\
+Widths
+======
+
+.. tabularcolumns:: |p{3cm}|
+
++-----+-----+----------+
+| a   | b   | c        |
++=====+=====+==========+
+| d   | e   | f        |
++-----+-----+----------+
+"""
+
+CONTENT = """\
+Content
+=======
+
+.. list-table::
+
+   * - Name
+     - A description that is a lot longer than the name.
+   * - Another_long_identifier
+     - Short.
+"""
+
+
+def get_table(project, index=INDEX, **overrides):
+    project.write(index)
+    filenames = project.build(**overrides)
+    return Document(filenames[0]).tables[0]
+
+
+def test_cells_reuse_their_first_paragraph(project):
+    table = get_table(project)
+    assert [[[p.text for p in cell.paragraphs] for cell in row.cells]
+            for row in table.rows] == [
+        [['Name'], ['Description']],
+        [['one'], ['A paragraph.', 'Another paragraph.']],
+        [['two'], ['A list item', 'Another list item']],
+    ]
+    assert [p.style.name for p in table.cell(2, 1).paragraphs] == [
+        'List Bullet', 'List Bullet']
+
+
+def test_cells_span_columns(project):
+    table = get_table(project, SPANS)
+    assert [[cell.text for cell in row.cells] for row in table.rows] == [
+        ['Wide header', 'Wide header', 'Wide header', 'c'],
+        ['a', 'b', 'Wider', 'Wider'],
+    ]
+    assert [len(row._tr.tc_lst) for row in table.rows] == [2, 3]
+
+
+def test_cells_span_rows(project):
+    table = get_table(project, ROW_SPANS)
+    assert [[cell.text for cell in row.cells] for row in table.rows] == [
+        ['a', 'b', 'c'],
+        ['Tall and wide', 'Tall and wide', 'd'],
+        ['Tall and wide', 'Tall and wide', 'e'],
+        ['f', 'Tall', 'Tall'],
+        ['g', 'Tall', 'Tall'],
+    ]
+    assert [len(row._tr.tc_lst) for row in table.rows] == [3, 2, 2, 2, 2]
+
+
+def test_column_widths(project):
+    table = get_table(project, WIDTHS)
+    widths = [column.width for column in table.columns]
+    assert widths[0].twips == Cm(3).twips
+    assert widths[2] == 2 * widths[1]
+    assert [cell.width for cell in table.rows[1].cells] == widths
+
+
+def test_fixed_layout_fits_the_content(project):
+    table = get_table(project, CONTENT, docx_table_layout='fixed')
+    assert not table.autofit
+    widths = [column.width for column in table.columns]
+    # The longest word of the first column, 23 characters, is longer than
+    # its average.  The second column has 27.5 characters on average.
+    assert abs(float(widths[0]) / widths[1] - 23 / 27.5) < 0.001
+    tblW = table._tbl.tblPr.find(qn('w:tblW'))
+    assert tblW.get(qn('w:type')) == 'dxa'
+    assert int(tblW.get(qn('w:w'))) == sum(w.twips for w in widths)
@@ -0,0 +1,59 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from docxsphinx import timing
+
+
+def test_timings_are_written(project):
+    project.copy()
+    project.build()
+
+    with open(os.path.join(project.outdir(), 'docx-timings.json')) as f:
+        timings = json.load(f)
+    phases = timings['phases']
+    for name in ('read', 'resolve', 'cache', 'translate', 'assemble', 'save'):
+        assert phases[name]['calls'] > 0
+        assert set(phases[name]) == set(
+            ['wall', 'cpu', 'rss_growth', 'peak_rss', 'calls'])
+    assert phases['translate']['calls'] == 3
+    assert timings['peak_rss'] >= max(p['peak_rss'] for p in phases.values())
+    # The first document is read, the others are loaded while the one
+    # before is translated.
+    assert phases['read']['calls'] == 1
+    assert phases['prefetch']['calls'] == 2
+
+
+def test_memory_taken_in_a_nested_phase_only_counts_for_it():
+    if not timing.get_rss():
+        pytest.skip('/proc/self/statm is not available')
+    timer = timing.PhaseTimer()
+    with timer.phase('outer'):
+        with timer.phase('inner'):
+            kept = bytearray(64 * 1024 * 1024)
+            for i in range(0, len(kept), 4096):
+                kept[i] = 1
+    assert timer.phases['inner']['rss_growth'] >= 32 * 1024 * 1024
+    assert abs(timer.phases['outer']['rss_growth']) < 16 * 1024 * 1024
+    del kept
+
+
+def test_cpu_time_of_other_threads_is_not_counted():
+    if not hasattr(time, 'thread_time'):
+        pytest.skip('time.thread_time() needs Python 3.7')
+    timer = timing.PhaseTimer()
+    with timer.phase('waiting'):
+        thread = threading.Thread(target=spin, args=(0.3,))
+        thread.start()
+        thread.join()
+    assert timer.phases['waiting']['wall'] >= 0.3
+    assert timer.phases['waiting']['cpu'] < 0.1
+
+
+def spin(seconds):
+    end = time.time() + seconds
+    while time.time() < end:
+        pass
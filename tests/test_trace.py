@@ -0,0 +1,46 @@
+import logging
+import os
+import zipfile
+
+from docx import Document
+
+
+def test_trace(project):
+    project.copy()
+    lines = []
+    handler = logging.Handler()
+    handler.emit = lambda record: lines.append(record.getMessage())
+    logger = logging.getLogger('docx')
+    logger.addHandler(handler)
+    level = logger.level
+    logger.setLevel(logging.INFO)
+    try:
+        project.build(docx_trace=['title'], docx_trace_limit=2)
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(level)
+    traced = [line.split()[:2] for line in lines
+              if line.lstrip().startswith(('visit', 'depart'))]
+    # Two lines for each of the three documents.
+    assert traced == [['visit', 'title'], ['depart', 'title']] * 3
+
+
+def test_tracing_does_not_change_the_output(project):
+    project.write('Trace\n=====\n\n'
+                  'Run :program:`make` and :command:`ls` now.\n')
+    cache_dir = project.outdir('cache')
+    plain, = project.build('plain', docx_cache_dir=cache_dir)
+    with zipfile.ZipFile(plain) as f:
+        expected = f.read('word/document.xml')
+    # The fragment is in the cache, but has to be translated to be traced.
+    traced, = project.build('traced', docx_cache_dir=cache_dir,
+                            docx_trace=True)
+    with zipfile.ZipFile(traced) as f:
+        assert f.read('word/document.xml') == expected
+    paragraph = [p for p in Document(traced).paragraphs
+                 if p.text.startswith('Run')][0]
+    assert [(r.text, r.bold) for r in paragraph.runs] == [
+        ('Run ', None), ('make', True), (' and ', None), ('ls', True),
+        (' now.', None)]
+    with open(os.path.join(project.outdir('traced'), 'docx.log')) as f:
+        assert 'visit literal_strong' in f.read()
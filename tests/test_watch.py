@@ -0,0 +1,92 @@
+import os
+import time
+import zipfile
+
+import pytest
+
+from docxsphinx.watch import Watcher
+
+
+def touch(filename, mtime):
+    with open(filename, 'a'):
+        pass
+    os.utime(filename, (mtime, mtime))
+
+
+def test_poll(tmpdir):
+    srcdir = tmpdir.mkdir('source')
+    outdir = srcdir.join('_build')
+    watcher = Watcher(str(srcdir), str(outdir))
+    for name in ('conf.py', 'index.rst', 'removed.rst'):
+        touch(str(srcdir.join(name)), 1000)
+    assert sorted(watcher.poll()) == sorted(
+        str(srcdir.join(name))
+        for name in ('conf.py', 'index.rst', 'removed.rst'))
+    assert watcher.poll() == []
+
+    touch(str(srcdir.join('index.rst')), 2000)
+    touch(str(srcdir.join('added.rst')), 2000)
+    srcdir.join('removed.rst').remove()
+    # Neither the output nor the doctrees are sources.
+    outdir.ensure_dir('.doctrees')
+    touch(str(outdir.join('test.docx')), 2000)
+    touch(str(outdir.join('.doctrees', 'index.doctree')), 2000)
+    assert sorted(watcher.poll()) == sorted(
+        str(srcdir.join(name))
+        for name in ('added.rst', 'index.rst', 'removed.rst'))
+
+
+def read_document(filename):
+    with zipfile.ZipFile(filename) as docx:
+        return docx.read('word/document.xml').decode('utf-8')
+
+
+def test_rebuild_after_edit(project):
+    project.write('Watched\n=======\n\nFirst version.\n')
+    watcher = Watcher(project.srcdir, project.outdir())
+    watcher.poll()
+    watcher.build()
+    app = watcher.app
+    docx_filename = app.builder.get_targets()[0][0]
+    assert 'First version.' in read_document(docx_filename)
+    assert watcher.rebuild() == []
+
+    index = os.path.join(project.srcdir, 'index.rst')
+    with open(index, 'w') as f:
+        f.write('Watched\n=======\n\nSecond version.\n')
+    os.utime(index, (2000000000, 2000000000))
+    assert watcher.rebuild() == [index]
+    assert watcher.app is app
+    assert 'Second version.' in read_document(docx_filename)
+
+    def fail():
+        raise RuntimeError('build failed')
+    app.build = fail
+    os.utime(index, (2000000001, 2000000001))
+    assert watcher.rebuild() == [index]
+    # The application of a failed build is not used again.
+    assert watcher.app is None
+
+
+def test_first_build_fails(project, monkeypatch):
+    project.write('Watched\n=======\n', conf="raise ValueError('bad conf')\n")
+    watcher = Watcher(project.srcdir, project.outdir(), interval=0)
+    sleeps = []
+
+    def sleep(seconds):
+        if sleeps:
+            raise KeyboardInterrupt
+        sleeps.append(seconds)
+        conf = os.path.join(project.srcdir, 'conf.py')
+        with open(conf, 'w') as f:
+            f.write("extensions = ['docxsphinx']\nmaster_doc = 'index'\n")
+        os.utime(conf, (2000000000, 2000000000))
+    monkeypatch.setattr(time, 'sleep', sleep)
+
+    # The watcher keeps polling after the failed build, and builds once
+    # conf.py is fixed.
+    with pytest.raises(KeyboardInterrupt):
+        watcher.run()
+    assert sleeps == [0]
+    assert watcher.app is not None
+    assert os.path.isfile(watcher.app.builder.get_targets()[0][0])